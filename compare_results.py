@@ -10,6 +10,7 @@ to analyze performance differences, ranking accuracy, and score distributions.
 import json
 import os
 import glob
+import argparse
 from typing import Dict, List, Any
 import numpy as np
 
@@ -22,6 +23,24 @@ def load_results(file_path: str) -> Dict[str, Any]:
         print(f"❌ Error loading {file_path}: {e}")
         return {}
 
+def is_test_results(data: Dict[str, Any]) -> bool:
+    """True for a single model's {test_name: {"test_case", "result", ...}} mapping"""
+    return any(isinstance(v, dict) and "result" in v for v in data.values())
+
+def load_model_results(file_path: str) -> Dict[str, Dict[str, Any]]:
+    """Load a result file as {model_key: {test_name: ...}}
+
+    Per-model files (results/<model_key>_results.json) hold one model's tests;
+    combined files written with --model-type/--implementation nest several
+    models under their keys and are unnested here.
+    """
+    data = load_results(file_path)
+    if not data:
+        return {}
+    if is_test_results(data):
+        return {os.path.basename(file_path).replace("_results.json", ""): data}
+    return {key: tests for key, tests in data.items() if isinstance(tests, dict) and is_test_results(tests)}
+
 def compare_rankings(rankings1: List[Dict], rankings2: List[Dict], model1_name: str, model2_name: str) -> Dict[str, Any]:
     """Compare rankings between two models"""
     if not rankings1 or not rankings2:
@@ -162,8 +181,102 @@ def compare_models_on_test_case(model1_results: Dict, model2_results: Dict, test
         "comparison": comparison
     }
 
+def get_model_stats_from_store(store: Dict[str, Any], model_name: str, run: str = None) -> Dict[str, Any]:
+    """Get statistics for a single model from the columnar store's segment index"""
+    from results_store import select_segments
+
+    segments = select_segments(store, model=model_name, run=run)
+    successful_times = segments["latency"][segments["success"]]
+    total_tests = len(segments)
+    successful_tests = len(successful_times)
+
+    return {
+        "total_tests": total_tests,
+        "successful_tests": successful_tests,
+        "success_rate": (successful_tests / total_tests * 100) if total_tests > 0 else 0,
+        "avg_time": float(successful_times.mean()) if successful_tests else 0,
+        "min_time": float(successful_times.min()) if successful_tests else 0,
+        "max_time": float(successful_times.max()) if successful_tests else 0
+    }
+
+def main_store(store_dir: str, models: List[str] = None, run: str = None):
+    """Run comparison analysis against a memory-mapped columnar results store"""
+    from results_store import load_store, select_segments, get_rankings, latest_run
+
+    print("🔍 RERANKER RESULTS COMPARISON (COLUMNAR STORE)")
+    print("=" * 70)
+
+    store = load_store(store_dir)
+    # Default to the most recently converted run so repeated runs are not pooled together
+    run = run or latest_run(store)
+    model_names = [m for m in store["models"] if not models or m in models]
+
+    if not model_names:
+        print(f"❌ No matching models in {store_dir}")
+        return
+
+    print(f"📊 {len(model_names)} models, {len(store['columns']['score'])} stored rows, run: {run}")
+
+    model_stats = {}
+    for model_name in model_names:
+        stats = get_model_stats_from_store(store, model_name, run)
+        model_stats[model_name] = stats
+
+        print(f"\n🔍 {model_name}")
+        print("-" * 40)
+        print(f"  Total tests: {stats['total_tests']}")
+        print(f"  Successful tests: {stats['successful_tests']}")
+        print(f"  Success rate: {stats['success_rate']:.1f}%")
+        print(f"  Average time: {stats['avg_time']:.3f}s")
+        print(f"  Time range: {stats['min_time']:.3f}s - {stats['max_time']:.3f}s")
+
+    # Pairwise comparisons within each model family
+    for family in ("bge", "qwen"):
+        family_models = [m for m in model_names if family in m]
+        if len(family_models) < 2:
+            continue
+
+        print(f"\n🔍 {family.upper()} MODEL COMPARISONS")
+        print("=" * 50)
+
+        for i in range(len(family_models)):
+            for j in range(i + 1, len(family_models)):
+                model1_name = family_models[i]
+                model2_name = family_models[j]
+                tests1 = {store["tests"][t] for t in select_segments(store, model=model1_name, run=run)["test_id"]}
+                tests2 = {store["tests"][t] for t in select_segments(store, model=model2_name, run=run)["test_id"]}
+
+                print(f"\n📊 Comparing {model1_name} vs {model2_name}")
+                for test_name in sorted(tests1 & tests2):
+                    comp = compare_rankings(
+                        get_rankings(store, model1_name, test_name, run),
+                        get_rankings(store, model2_name, test_name, run),
+                        model1_name,
+                        model2_name
+                    )
+                    print(f"  {test_name}: top rank {'✅' if comp['top_rank_match'] else '❌'}, "
+                          f"ranking {'✅' if comp['ranking_match'] else '❌'}, "
+                          f"avg score diff {comp['avg_score_difference']:.4f}, correlation {comp['correlation']:.4f}")
+
+    print(f"\n⚡ PERFORMANCE SUMMARY")
+    print("=" * 50)
+    sorted_models = sorted(model_stats.items(), key=lambda x: x[1]["avg_time"])
+    print("Models ranked by average response time (fastest first):")
+    for i, (model_name, stats) in enumerate(sorted_models, 1):
+        print(f"  {i}. {model_name}: {stats['avg_time']:.3f}s (min: {stats['min_time']:.3f}s, max: {stats['max_time']:.3f}s)")
+
 def main():
     """Run comprehensive comparison analysis"""
+    parser = argparse.ArgumentParser(description="Comprehensive Reranker Results Comparison")
+    parser.add_argument("--store", help="Read from a columnar results store directory instead of results/*_results.json")
+    parser.add_argument("--model", action="append", help="Only analyze this model (store mode, repeatable)")
+    parser.add_argument("--run", help="Only analyze this run id (store mode, default: latest run)")
+    args = parser.parse_args()
+
+    if args.store:
+        main_store(args.store, args.model, args.run)
+        return
+
     print("🔍 COMPREHENSIVE RERANKER RESULTS COMPARISON")
     print("=" * 70)
     
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Near-Duplicate Candidate Detection
+==================================
+
+Finds exact and near-duplicate documents within one candidate set so each
+cluster is scored once. Exact duplicates are grouped by a hash of the
+normalized text; near duplicates by MinHash signatures over word shingles with
+LSH banding, verified by exact shingle Jaccard similarity against the cluster
+representative (not against any member, so clusters cannot chain).
+
+The representative of each cluster is scored by the reranker and its score is
+copied to every member, keeping the original `index` values in the output.
+
+Usage:
+    from dedup import rerank_with_dedup
+
+    result = rerank_with_dedup(test_case, lambda tc: test_ollama_reranker(tc, "bge-v2-m3"))
+
+    # Or from the test framework
+    uv run python test_reranker.py --dedup --dedup-threshold 0.85
+"""
+
+import hashlib
+import re
+import time
+import zlib
+from typing import Dict, List, Any
+
+import numpy as np
+
+DEFAULT_THRESHOLD = 0.85
+DEFAULT_NUM_PERM = 64
+DEFAULT_BANDS = 16
+DEFAULT_SHINGLE_SIZE = 3
+
+MINHASH_PRIME = 4294967311  # smallest prime above 2**32
+MINHASH_SEED = 1
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace so trivial formatting differences match"""
+    return " ".join(text.lower().split())
+
+def get_shingles(text: str, shingle_size: int = DEFAULT_SHINGLE_SIZE) -> np.ndarray:
+    """32-bit hashes of the word shingles of a normalized text"""
+    words = re.findall(r"\w+", text)
+    if len(words) <= shingle_size:
+        shingles = [" ".join(words)]
+    else:
+        shingles = [" ".join(words[i:i + shingle_size]) for i in range(len(words) - shingle_size + 1)]
+    return np.array([zlib.crc32(s.encode("utf-8")) for s in shingles], dtype=np.uint64)
+
+def get_minhash_params(num_perm: int = DEFAULT_NUM_PERM):
+    """Fixed random (a, b) coefficients for the MinHash permutations"""
+    rng = np.random.default_rng(MINHASH_SEED)
+    a = rng.integers(1, 2**32, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, 2**32, size=num_perm, dtype=np.uint64)
+    return a, b
+
+def minhash_signature(shingles: np.ndarray, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """MinHash signature: minimum of (a * h + b) mod p over all shingle hashes, per permutation"""
+    return ((np.outer(a, shingles) + b[:, None]) % MINHASH_PRIME).min(axis=1)
+
+def shingle_jaccard(shingles1: np.ndarray, shingles2: np.ndarray) -> float:
+    """Exact Jaccard similarity of two shingle hash sets"""
+    intersection = len(np.intersect1d(shingles1, shingles2))
+    return intersection / (len(shingles1) + len(shingles2) - intersection)
+
+def find_duplicate_clusters(documents: List[str], threshold: float = DEFAULT_THRESHOLD, num_perm: int = DEFAULT_NUM_PERM,
+                            bands: int = DEFAULT_BANDS, shingle_size: int = DEFAULT_SHINGLE_SIZE) -> List[List[int]]:
+    """Group document indices into clusters of exact or near duplicates
+
+    Clusters are sorted lists of original indices; the first index of each
+    cluster is its representative. Near duplicates are clustered greedily
+    around representatives: a document joins the most similar earlier
+    representative whose Jaccard similarity to it reaches the threshold, so
+    chains of small edits cannot drift away from the score being copied. A
+    threshold of 1.0 only groups exact duplicates.
+    """
+    # Exact duplicates: identical normalized text
+    normalized = [normalize_text(doc) for doc in documents]
+    first_by_hash = {}
+    unique = []
+    cluster_of = {}
+    for i, text in enumerate(normalized):
+        digest = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        if digest in first_by_hash:
+            cluster_of[i] = first_by_hash[digest]
+        else:
+            first_by_hash[digest] = i
+            cluster_of[i] = i
+            unique.append(i)
+
+    # Near duplicates: LSH over MinHash signatures finds candidate representatives,
+    # exact shingle Jaccard against the representative decides
+    if threshold < 1.0 and len(unique) > 1:
+        a, b = get_minhash_params(num_perm)
+        shingles = {i: np.unique(get_shingles(normalized[i], shingle_size)) for i in unique}
+        rows = num_perm // bands
+        buckets = [{} for _ in range(bands)]
+        for i in unique:
+            signature = minhash_signature(shingles[i], a, b)
+            keys = [signature[band * rows:(band + 1) * rows].tobytes() for band in range(bands)]
+            candidates = {leader for band, key in enumerate(keys) for leader in buckets[band].get(key, ())}
+
+            # Most similar representative wins; ties go to the earliest
+            matches = [(shingle_jaccard(shingles[i], shingles[leader]), -leader) for leader in candidates]
+            similarity, neg_leader = max(matches, default=(0.0, 0))
+            if matches and similarity >= threshold:
+                cluster_of[i] = -neg_leader
+                continue
+
+            # No representative is close enough: i represents a new cluster
+            for band, key in enumerate(keys):
+                buckets[band].setdefault(key, []).append(i)
+
+    clusters = {}
+    for i in range(len(documents)):
+        # Exact duplicates point at their first occurrence, which may itself have joined a cluster
+        clusters.setdefault(cluster_of[cluster_of[i]], []).append(i)
+    return sorted(clusters.values(), key=lambda members: members[0])
+
+def rerank_with_dedup(test_case: Dict[str, Any], rerank, threshold: float = DEFAULT_THRESHOLD) -> Dict[str, Any]:
+    """Score one representative per duplicate cluster and copy its score to every member
+
+    `rerank` takes a test case and returns a result dict in the
+    test_official_reranker / test_ollama_reranker format.
+    """
+    documents = test_case["documents"]
+    if not documents:
+        return rerank(test_case)
+
+    start_time = time.time()
+    clusters = find_duplicate_clusters(documents, threshold)
+    dedup_time = time.time() - start_time
+
+    # top_n is applied after expansion, since one representative can stand for many documents
+    reduced_case = {k: v for k, v in test_case.items() if k != "top_n"}
+    reduced_case["documents"] = [documents[members[0]] for members in clusters]
+    result = rerank(reduced_case)
+
+    dedup_stats = {
+        "documents": len(documents),
+        "unique": len(clusters),
+        "duplicates": len(documents) - len(clusters),
+        "time": dedup_time
+    }
+    if not result["success"]:
+        return {**result, "dedup": dedup_stats}
+
+    results = []
+    for res in result["results"]:
+        for index in clusters[res["index"]]:
+            results.append({**res, "index": index, "document": documents[index]})
+
+    results.sort(key=lambda x: (-x["relevance_score"], x["index"]))
+    if "top_n" in test_case:
+        results = results[:test_case["top_n"]]
+
+    return {
+        **result,
+        "results": results,
+        "time": result["time"] + dedup_time,
+        "dedup": dedup_stats
+    }
@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Live Reranker Metrics Exporter
+==============================
+
+Collects per-model request counters, error counts, latency histograms,
+documents-per-second and cache hit rates while a run is in progress, and serves
+them over local HTTP in the Prometheus text exposition format.
+
+Usage:
+    uv run python test_reranker.py --metrics-port 9108
+
+    # Then scrape
+    curl http://localhost:9108/metrics
+"""
+
+import math
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Tuple
+
+DEFAULT_METRICS_PORT = 9108
+LATENCY_BUCKETS = [0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0]
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+def escape_label(value) -> str:
+    """Escape a label value for the text exposition format"""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def format_labels(labels: Tuple[Tuple[str, str], ...]) -> str:
+    """Render a sorted label tuple as {name="value",...}"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{escape_label(value)}"' for name, value in labels) + "}"
+
+def format_value(value: float) -> str:
+    """Render a sample value, including +Inf/NaN"""
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class MetricsRegistry:
+    """Thread-safe store of reranker counters and histograms"""
+
+    def __init__(self, buckets: List[float] = None):
+        self.buckets = buckets or LATENCY_BUCKETS
+        self.lock = threading.Lock()
+        self.counters = {}    # (name, labels) -> value
+        self.histograms = {}  # labels -> {"buckets": [...], "sum": float, "count": int}
+
+    def inc(self, name: str, labels: Dict[str, str], value: float = 1):
+        """Increment a counter"""
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe_latency(self, labels: Dict[str, str], seconds: float):
+        """Add a request duration to the latency histogram"""
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            histogram = self.histograms.setdefault(key, {"buckets": [0] * len(self.buckets), "sum": 0.0, "count": 0})
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram["buckets"][i] += 1
+            histogram["sum"] += seconds
+            histogram["count"] += 1
+
+    def observe_request(self, model: str, implementation: str, result: Dict, num_documents: int):
+        """Record one rerank call result from test_official_reranker / test_ollama_reranker"""
+        labels = {"model": model, "implementation": implementation}
+        self.inc("reranker_requests_total", labels)
+        if not result.get("success"):
+            self.inc("reranker_errors_total", labels)
+            return
+        self.inc("reranker_documents_total", labels, num_documents)
+        self.inc("reranker_busy_seconds_total", labels, result.get("time", 0))
+        self.observe_latency(labels, result.get("time", 0))
+
+    def observe_cache(self, model: str, cache: str, hits: int, lookups: int):
+        """Record cache lookups and hits for a model (e.g. dedup or embedding caches)"""
+        labels = {"model": model, "cache": cache}
+        self.inc("reranker_cache_hits_total", labels, hits)
+        self.inc("reranker_cache_lookups_total", labels, lookups)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format"""
+        with self.lock:
+            counters = dict(self.counters)
+            histograms = {k: {"buckets": list(v["buckets"]), "sum": v["sum"], "count": v["count"]}
+                          for k, v in self.histograms.items()}
+
+        lines = []
+        descriptions = {
+            "reranker_requests_total": "Rerank requests completed",
+            "reranker_errors_total": "Rerank requests that failed",
+            "reranker_documents_total": "Documents scored by successful requests",
+            "reranker_busy_seconds_total": "Seconds spent in successful rerank requests",
+            "reranker_cache_hits_total": "Cache hits",
+            "reranker_cache_lookups_total": "Cache lookups"
+        }
+        for name, help_text in descriptions.items():
+            samples = sorted((labels, value) for (n, labels), value in counters.items() if n == name)
+            if not samples:
+                continue
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} counter")
+            for labels, value in samples:
+                lines.append(f"{name}{format_labels(labels)} {format_value(value)}")
+
+        # Derived gauges so dashboards get throughput and hit rate without PromQL
+        docs = {labels: v for (n, labels), v in counters.items() if n == "reranker_documents_total"}
+        busy = {labels: v for (n, labels), v in counters.items() if n == "reranker_busy_seconds_total"}
+        if docs:
+            lines.append("# HELP reranker_documents_per_second Documents scored per second of request time")
+            lines.append("# TYPE reranker_documents_per_second gauge")
+            for labels in sorted(docs):
+                rate = docs[labels] / busy[labels] if busy.get(labels) else 0.0
+                lines.append(f"reranker_documents_per_second{format_labels(labels)} {format_value(rate)}")
+
+        hits = {labels: v for (n, labels), v in counters.items() if n == "reranker_cache_hits_total"}
+        lookups = {labels: v for (n, labels), v in counters.items() if n == "reranker_cache_lookups_total"}
+        if lookups:
+            lines.append("# HELP reranker_cache_hit_ratio Fraction of cache lookups that hit")
+            lines.append("# TYPE reranker_cache_hit_ratio gauge")
+            for labels in sorted(lookups):
+                ratio = hits.get(labels, 0) / lookups[labels] if lookups[labels] else 0.0
+                lines.append(f"reranker_cache_hit_ratio{format_labels(labels)} {format_value(ratio)}")
+
+        if histograms:
+            name = "reranker_request_duration_seconds"
+            lines.append(f"# HELP {name} Rerank request latency")
+            lines.append(f"# TYPE {name} histogram")
+            for labels in sorted(histograms):
+                histogram = histograms[labels]
+                for bound, count in zip(self.buckets, histogram["buckets"]):
+                    lines.append(f"{name}_bucket{format_labels(labels + (('le', format_value(bound)),))} {count}")
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', '+Inf'),))} {histogram['count']}")
+                lines.append(f"{name}_sum{format_labels(labels)} {format_value(histogram['sum'])}")
+                lines.append(f"{name}_count{format_labels(labels)} {histogram['count']}")
+
+        return "\n".join(lines) + "\n"
+
+def start_metrics_server(registry: MetricsRegistry, port: int = DEFAULT_METRICS_PORT, host: str = "127.0.0.1"):
+    """Serve registry.render() at /metrics on a background thread and return the server"""
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_response(404)
+                self.end_headers()
+                return
+            body = registry.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
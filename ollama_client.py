@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""
+Multi-Endpoint Ollama Rerank Client
+===================================
+
+Client for a pool of Ollama instances serving the same reranker models.
+Requests go to the healthy endpoint with the fewest outstanding requests, and
+large document lists are split into sub-requests across instances and merged
+back with global sorting and `top_n`.
+
+Optionally, requests are hedged: if a request has not finished after the
+model's observed latency percentile, a duplicate is sent to another endpoint
+and whichever finishes first wins; the slower attempt's connection is closed
+so its node is freed. Timeouts can also adapt to each model's measured latency
+instead of the fixed default. The latency window can be seeded from earlier
+`results/*_results.json` files so a short sweep is calibrated from the start.
+
+Usage:
+    from ollama_client import OllamaPool
+
+    pool = OllamaPool(["http://node1:11434", "http://node2:11434"])
+    result = pool.rerank("bge-v2-m3", query, documents, top_n=10)
+
+    # Hedge after the p95 latency and adapt timeouts per model
+    pool = OllamaPool(endpoints, hedge_percentile=95, adaptive_timeout=True, min_latency_samples=5)
+    pool.seed_latencies("bge-v2-m3", load_latency_history("bge-v2-m3"))
+
+    # Or from the test framework
+    uv run python test_reranker.py --implementation ollama \\
+        --ollama-endpoints http://node1:11434 http://node2:11434 --hedge-percentile 95 --adaptive-timeout
+
+For local testing, point the pool at stub servers from `ollama_stub.py`.
+"""
+
+import glob
+import http.client
+import json
+import math
+import os
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any
+from urllib.parse import urlsplit
+
+import numpy as np
+import requests
+
+DEFAULT_OLLAMA_URL = "http://localhost:11434"
+DEFAULT_TIMEOUT = 10
+HEALTH_CHECK_TIMEOUT = 2
+HEALTH_CHECK_INTERVAL = 30
+MIN_SHARD_SIZE = 16
+
+# Hedging and adaptive timeouts
+LATENCY_WINDOW = 200             # recent latencies kept per model
+MIN_LATENCY_SAMPLES = 20         # default: no hedging or timeout adaptation before this many samples
+ADAPTIVE_TIMEOUT_MULTIPLIER = 3.0
+MIN_ADAPTIVE_TIMEOUT = 1.0
+MAX_ADAPTIVE_TIMEOUT = 60.0
+LATENCY_HISTORY_DIRS = ["results/baseline", "results"]
+
+class HedgeCancelled(Exception):
+    """Raised in an attempt whose connection was closed because another attempt won"""
+
+def load_latency_history(model: str, result_dirs: List[str] = None) -> List[float]:
+    """Successful request latencies for an Ollama model from earlier *_results.json files
+
+    Handles both per-model files and the combined files written with
+    --model-type/--implementation. Tests without documents are skipped since
+    they short-circuit and say nothing about the model's latency.
+    """
+    suffix = f"_ollama_{model.replace('/', '_')}"
+    latencies = []
+    for directory in result_dirs or LATENCY_HISTORY_DIRS:
+        for file_path in sorted(glob.glob(os.path.join(directory, "*_results.json"))):
+            try:
+                with open(file_path, 'r') as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                continue
+            key = os.path.basename(file_path).replace("_results.json", "")
+            groups = {key: data} if key.endswith(suffix) else {k: v for k, v in data.items() if k.endswith(suffix)}
+            for tests in groups.values():
+                for test in tests.values():
+                    result = test.get("result", {}) if isinstance(test, dict) else {}
+                    if result.get("success") and result.get("time", 0) > 0 and test.get("test_case", {}).get("documents"):
+                        latencies.append(result["time"])
+    return latencies
+
+class OllamaPool:
+    """Pool of Ollama endpoints with health checks and least-outstanding-requests balancing"""
+
+    def __init__(self, endpoints: List[str] = None, timeout: float = DEFAULT_TIMEOUT,
+                 health_check_interval: float = HEALTH_CHECK_INTERVAL, min_shard_size: int = MIN_SHARD_SIZE,
+                 hedge_percentile: float = None, adaptive_timeout: bool = False,
+                 min_latency_samples: int = MIN_LATENCY_SAMPLES):
+        self.endpoints = [e.rstrip("/") for e in (endpoints or [DEFAULT_OLLAMA_URL])]
+        self.timeout = timeout
+        self.hedge_percentile = hedge_percentile
+        self.adaptive_timeout = adaptive_timeout
+        self.min_latency_samples = min_latency_samples
+        self.health_check_interval = health_check_interval
+        self.min_shard_size = min_shard_size
+        self.session = requests.Session()
+        self.lock = threading.Lock()
+        self.state = {
+            endpoint: {"healthy": True, "outstanding": 0, "requests": 0, "errors": 0, "last_check": 0.0}
+            for endpoint in self.endpoints
+        }
+        self.latencies = {}
+        self.model_stats = {}
+        self.executor = ThreadPoolExecutor(max_workers=max(4, 4 * len(self.endpoints)))
+        # Separate workers for hedged attempts so they never wait behind shard sub-requests
+        self.hedge_executor = ThreadPoolExecutor(max_workers=max(8, 8 * len(self.endpoints)))
+
+    def check_health(self, endpoint: str) -> bool:
+        """Probe one endpoint and record whether it is healthy"""
+        try:
+            response = self.session.get(f"{endpoint}/api/version", timeout=HEALTH_CHECK_TIMEOUT)
+            healthy = response.status_code == 200
+        except requests.RequestException:
+            healthy = False
+        with self.lock:
+            self.state[endpoint]["healthy"] = healthy
+            self.state[endpoint]["last_check"] = time.time()
+        return healthy
+
+    def check_all(self) -> Dict[str, bool]:
+        """Probe every endpoint in parallel"""
+        return dict(zip(self.endpoints, self.executor.map(self.check_health, self.endpoints)))
+
+    def healthy_endpoints(self) -> List[str]:
+        """Endpoints currently considered healthy, re-probing stale unhealthy ones"""
+        now = time.time()
+        for endpoint in self.endpoints:
+            state = self.state[endpoint]
+            if not state["healthy"] and now - state["last_check"] > self.health_check_interval:
+                self.check_health(endpoint)
+        return [e for e in self.endpoints if self.state[e]["healthy"]]
+
+    def acquire(self, exclude: List[str] = ()) -> str:
+        """Pick the healthy endpoint with the fewest outstanding requests"""
+        candidates = [e for e in self.healthy_endpoints() if e not in exclude]
+        if not candidates:
+            # Every node looks down; try anything not yet excluded rather than failing outright
+            candidates = [e for e in self.endpoints if e not in exclude] or self.endpoints
+        with self.lock:
+            endpoint = min(candidates, key=lambda e: (self.state[e]["outstanding"], self.state[e]["requests"]))
+            self.state[endpoint]["outstanding"] += 1
+            self.state[endpoint]["requests"] += 1
+        return endpoint
+
+    def release(self, endpoint: str, failed: bool = False):
+        """Return an endpoint after a request, marking it unhealthy on connection failure"""
+        with self.lock:
+            self.state[endpoint]["outstanding"] -= 1
+            if failed:
+                self.state[endpoint]["errors"] += 1
+                self.state[endpoint]["healthy"] = False
+                self.state[endpoint]["last_check"] = time.time()
+
+    def record_latency(self, model: str, latency: float):
+        """Add a successful request latency to the model's sliding window"""
+        with self.lock:
+            self.latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).append(latency)
+
+    def seed_latencies(self, model: str, latencies: List[float]) -> int:
+        """Pre-fill a model's latency window, e.g. from load_latency_history(); returns the samples added"""
+        latencies = list(latencies)[-LATENCY_WINDOW:]
+        with self.lock:
+            self.latencies.setdefault(model, deque(maxlen=LATENCY_WINDOW)).extend(latencies)
+        return len(latencies)
+
+    def warm_up(self, model: str, query: str, documents: List[str], requests_count: int, instruction: str = None) -> int:
+        """Send requests_count unhedged rerank requests to calibrate a model; returns how many succeeded"""
+        payload = {"model": model, "query": query, "documents": documents}
+        if instruction is not None:
+            payload["instruction"] = instruction
+        succeeded = 0
+        for _ in range(requests_count):
+            try:
+                self.send("/api/rerank", payload, self.timeout)
+                succeeded += 1
+            except requests.RequestException:
+                pass
+        return succeeded
+
+    def latency_percentile(self, model: str, percentile: float) -> float:
+        """Observed latency percentile for a model, or None until enough samples exist"""
+        with self.lock:
+            samples = list(self.latencies.get(model, ()))
+        if len(samples) < self.min_latency_samples:
+            return None
+        return float(np.percentile(samples, percentile))
+
+    def request_timeout(self, model: str) -> float:
+        """Timeout for a model: a multiple of its p99 latency when adaptive, else the fixed default"""
+        if not self.adaptive_timeout:
+            return self.timeout
+        p99 = self.latency_percentile(model, 99)
+        if p99 is None:
+            return self.timeout
+        return min(MAX_ADAPTIVE_TIMEOUT, max(MIN_ADAPTIVE_TIMEOUT, ADAPTIVE_TIMEOUT_MULTIPLIER * p99))
+
+    def hedge_delay(self, model: str) -> float:
+        """Delay before sending a hedged duplicate, or None when hedging is off or not yet calibrated"""
+        if self.hedge_percentile is None:
+            return None
+        return self.latency_percentile(model, self.hedge_percentile)
+
+    def count(self, model: str, key: str, value: float = 1):
+        """Increment a per-model hedging counter"""
+        with self.lock:
+            stats = self.model_stats.setdefault(model, {"requests": 0, "hedged": 0, "hedge_wins": 0, "abandoned_time": 0.0})
+            stats[key] += value
+
+    def send(self, path: str, payload: Dict[str, Any], timeout: float, retries: int = 1,
+             attempt: Dict[str, Any] = None) -> Dict[str, Any]:
+        """POST to the least-loaded endpoint, retrying on another endpoint if it is unreachable
+
+        With an `attempt` handle (see post()), the request runs on its own
+        connection that cancel_attempt() can close from another thread.
+        """
+        tried = []
+        while True:
+            if attempt is not None and attempt["cancelled"]:
+                raise HedgeCancelled()
+            endpoint = self.acquire(exclude=tried)
+            tried.append(endpoint)
+            start_time = time.time()
+            try:
+                if attempt is None:
+                    response = self.session.post(f"{endpoint}{path}", json=payload, timeout=timeout)
+                else:
+                    response = self.post_cancellable(endpoint, path, payload, timeout, attempt)
+            except HedgeCancelled:
+                # Not the node's fault; release right away so it takes new work
+                self.release(endpoint)
+                raise
+            except requests.RequestException:
+                self.release(endpoint, failed=True)
+                if len(tried) > retries or len(tried) >= len(self.endpoints):
+                    raise
+                continue
+            self.release(endpoint)
+            # HTTP errors (bad model, bad input) are not the node's fault, so no retry
+            response.raise_for_status()
+            self.record_latency(payload.get("model"), time.time() - start_time)
+            return response.json()
+
+    def post_cancellable(self, endpoint: str, path: str, payload: Dict[str, Any], timeout: float,
+                         attempt: Dict[str, Any]) -> requests.Response:
+        """POST on a dedicated connection registered in `attempt`, returning a requests.Response
+
+        Ollama only sends headers once scoring is done, so a pooled requests
+        call (even with stream=True) cannot be interrupted while the node is
+        busy. A dedicated connection can: closing its socket aborts the wait and
+        drops the request on the server.
+        """
+        url = urlsplit(endpoint)
+        connection_class = http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(url.hostname, url.port, timeout=timeout)
+        body = json.dumps(payload).encode("utf-8")
+        try:
+            # Connect under the lock so cancel_attempt() either sees the socket or we see the flag
+            with attempt["lock"]:
+                if attempt["cancelled"]:
+                    raise HedgeCancelled()
+                connection.connect()
+                attempt["connection"] = connection
+            connection.request("POST", f"{url.path}{path}", body=body, headers={"Content-Type": "application/json"})
+            raw = connection.getresponse()
+            content = raw.read()
+        except TimeoutError as e:
+            if attempt["cancelled"]:
+                raise HedgeCancelled() from e
+            raise requests.Timeout(e) from e
+        except (OSError, http.client.HTTPException) as e:
+            if attempt["cancelled"]:
+                raise HedgeCancelled() from e
+            raise requests.ConnectionError(e) from e
+        finally:
+            connection.close()
+
+        response = requests.Response()
+        response.status_code = raw.status
+        response.reason = raw.reason
+        response.url = f"{endpoint}{path}"
+        response.headers.update(raw.getheaders())
+        response._content = content
+        return response
+
+    def cancel_attempt(self, attempt: Dict[str, Any]):
+        """Close an attempt's connection so the node stops serving it and its slot is released"""
+        with attempt["lock"]:
+            attempt["cancelled"] = True
+            connection = attempt.get("connection")
+        # The attempt's own thread may close the connection concurrently, so read the socket once
+        sock = connection.sock if connection is not None else None
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def post(self, path: str, payload: Dict[str, Any], retries: int = 1) -> Dict[str, Any]:
+        """POST with the model's timeout, hedging slow requests when enabled"""
+        model = payload.get("model")
+        timeout = self.request_timeout(model)
+        delay = self.hedge_delay(model)
+        self.count(model, "requests")
+
+        if delay is None:
+            return self.send(path, payload, timeout, retries)
+
+        def new_attempt():
+            return {"cancelled": False, "connection": None, "lock": threading.Lock()}
+
+        start_time = time.time()
+        attempts = {}
+        primary_attempt = new_attempt()
+        primary = self.hedge_executor.submit(self.send, path, payload, timeout, retries, primary_attempt)
+        attempts[primary] = primary_attempt
+        done, _ = wait([primary], timeout=delay)
+        if done:
+            return primary.result()
+
+        # The primary is still outstanding, so least-outstanding balancing sends the hedge elsewhere
+        hedge_attempt = new_attempt()
+        hedge = self.hedge_executor.submit(self.send, path, payload, timeout, retries, hedge_attempt)
+        attempts[hedge] = hedge_attempt
+        self.count(model, "hedged")
+
+        pending = {primary, hedge}
+        winner = None
+        error = None
+        while pending and winner is None:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    winner = future
+                    break
+                error = future.exception()
+        if winner is None:
+            raise error
+
+        elapsed = time.time() - start_time
+        loser = hedge if winner is primary else primary
+        loser_running = not loser.done()
+        if loser_running:
+            self.cancel_attempt(attempts[loser])
+        if winner is hedge:
+            self.count(model, "hedge_wins")
+            if loser_running:
+                # The cancelled primary never reports its latency, so how much the hedge saved is unknown.
+                # Record how long it had been stuck, and keep that as a lower-bound sample so slow
+                # requests stay visible in the window
+                self.count(model, "abandoned_time", elapsed)
+                self.record_latency(model, elapsed)
+        return winner.result()
+
+    def shard(self, documents: List[str], shard_size: int = None) -> List[int]:
+        """Start offsets for splitting documents into one sub-request per healthy endpoint"""
+        if shard_size is None:
+            num_nodes = max(1, len(self.healthy_endpoints()))
+            shard_size = max(self.min_shard_size, math.ceil(len(documents) / num_nodes))
+        return list(range(0, len(documents), shard_size)) if documents else [0]
+
+    def rerank(self, model: str, query: str, documents: List[str], instruction: str = None,
+               top_n: int = None, shard_size: int = None) -> Dict[str, Any]:
+        """Rerank documents across the pool, merging sub-request results into one global ranking"""
+        offsets = self.shard(documents, shard_size)
+        size = offsets[1] - offsets[0] if len(offsets) > 1 else len(documents)
+
+        def sub_request(offset):
+            payload = {"model": model, "query": query, "documents": documents[offset:offset + size]}
+            if instruction is not None:
+                payload["instruction"] = instruction
+            # A single shard can apply top_n server-side; sharded requests need every score
+            if top_n is not None and len(offsets) == 1:
+                payload["top_n"] = top_n
+            results = self.post("/api/rerank", payload).get("results", [])
+            for res in results:
+                res["index"] += offset
+                res.setdefault("document", documents[res["index"]])
+            return results
+
+        start_time = time.time()
+        try:
+            if len(offsets) == 1:
+                results = sub_request(0)
+            else:
+                results = [res for part in self.executor.map(sub_request, offsets) for res in part]
+            results.sort(key=lambda x: x["relevance_score"], reverse=True)
+            if top_n is not None:
+                results = results[:top_n]
+            return {
+                "success": True,
+                "results": results,
+                "time": time.time() - start_time,
+                "error": None,
+                "shards": len(offsets)
+            }
+        except Exception as e:
+            return {
+                "success": False,
+                "results": [],
+                "time": time.time() - start_time,
+                "error": str(e),
+                "shards": len(offsets)
+            }
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-endpoint health and request counters"""
+        with self.lock:
+            return {endpoint: dict(state) for endpoint, state in self.state.items()}
+
+    def hedging_stats(self) -> Dict[str, Dict[str, Any]]:
+        """Per-model hedge rate, hedge wins, time abandoned primaries had run and current timeout"""
+        with self.lock:
+            model_stats = {model: dict(stats) for model, stats in self.model_stats.items()}
+        for model, stats in model_stats.items():
+            stats["hedge_rate"] = stats["hedged"] / stats["requests"] if stats["requests"] else 0.0
+            stats["hedge_delay"] = self.hedge_delay(model)
+            stats["timeout"] = self.request_timeout(model)
+        return model_stats
+
+    def close(self):
+        """Shut down worker threads and the HTTP session"""
+        self.executor.shutdown(wait=False)
+        self.hedge_executor.shutdown(wait=False)
+        self.session.close()
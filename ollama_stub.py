@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Ollama Rerank Stub Server
+=========================
+
+Minimal local stand-in for Ollama's `/api/rerank` and `/api/version` endpoints,
+used to exercise the multi-endpoint client without real models. Scores are a
+deterministic word-overlap between query and document.
+
+Usage:
+    # Three stub nodes, 50ms per request plus 1ms per document
+    uv run python ollama_stub.py --port 11501 --delay 0.05 --per-document-delay 0.001 &
+    uv run python ollama_stub.py --port 11502 --delay 0.05 --per-document-delay 0.001 &
+    uv run python ollama_stub.py --port 11503 --delay 0.05 --per-document-delay 0.001 &
+
+    uv run python test_reranker.py --implementation ollama --model bge-base \\
+        --ollama-endpoints http://localhost:11501 http://localhost:11502 http://localhost:11503
+"""
+
+import argparse
+import json
+import random
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+def overlap_score(query, document):
+    """Deterministic relevance score in [0, 1] from word overlap"""
+    query_words = set(re.findall(r"\w+", query.lower()))
+    doc_words = set(re.findall(r"\w+", document.lower()))
+    if not query_words or not doc_words:
+        return 0.0
+    return len(query_words & doc_words) / len(query_words)
+
+def make_handler(delay=0.0, per_document_delay=0.0, jitter=0.0, fail_rate=0.0):
+    """Build a request handler class with the given latency and failure profile"""
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def send_json(self, status, body):
+            data = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path == "/api/version":
+                self.send_json(200, {"version": "stub"})
+            else:
+                self.send_json(404, {"error": "not found"})
+
+        def do_POST(self):
+            if self.path != "/api/rerank":
+                self.send_json(404, {"error": "not found"})
+                return
+
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            documents = payload.get("documents", [])
+            if not documents:
+                # Ollama answers an empty document list with no results rather than an error
+                self.send_json(200, {"model": payload.get("model"), "results": []})
+                return
+
+            time.sleep(delay + per_document_delay * len(documents) + random.uniform(0, jitter))
+            if random.random() < fail_rate:
+                self.send_json(500, {"error": "stub failure"})
+                return
+
+            results = [
+                {"index": i, "document": doc, "relevance_score": overlap_score(payload.get("query", ""), doc)}
+                for i, doc in enumerate(documents)
+            ]
+            results.sort(key=lambda x: x["relevance_score"], reverse=True)
+            if "top_n" in payload:
+                results = results[:payload["top_n"]]
+            self.send_json(200, {"model": payload.get("model"), "results": results})
+
+    return StubHandler
+
+def start_stub_server(port=0, delay=0.0, per_document_delay=0.0, jitter=0.0, fail_rate=0.0):
+    """Start a stub server on a background thread and return (server, base_url)"""
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(delay, per_document_delay, jitter, fail_rate))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Ollama Rerank Stub Server")
+    parser.add_argument("--port", type=int, default=11500, help="Port to listen on")
+    parser.add_argument("--delay", type=float, default=0.0, help="Fixed delay per request in seconds")
+    parser.add_argument("--per-document-delay", type=float, default=0.0, help="Extra delay per document in seconds")
+    parser.add_argument("--jitter", type=float, default=0.0, help="Random extra delay up to this many seconds")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="Fraction of requests answered with HTTP 500")
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", args.port),
+                                 make_handler(args.delay, args.per_document_delay, args.jitter, args.fail_rate))
+    print(f"🧪 Ollama stub listening on http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+Reranker Performance Regression Check
+=====================================
+
+Compares a new benchmark run (results/*_results.json) against a pinned
+baseline per model and exits non-zero when a model or template change makes
+things slower or reorders results.
+
+Latency percentiles and throughput are compared with bootstrap confidence
+intervals, so a single noisy request does not fail the gate. Rankings are
+compared per test case with top-1, Kendall tau and score-drift thresholds.
+
+Usage:
+    # Pin the current results as the baseline
+    uv run python regression_check.py --pin
+
+    # Check the current results against the pinned baseline
+    uv run python regression_check.py
+
+    # Check a single model with stricter thresholds
+    uv run python regression_check.py --model bge_ollama_bge-base --latency-tolerance 0.05
+"""
+
+import argparse
+import glob
+import json
+import os
+import sys
+from typing import Dict, List, Any
+
+import numpy as np
+
+from compare_results import load_model_results
+
+RESULTS_DIR = "results"
+BASELINE_DIR = "results/baseline"
+
+# Default thresholds
+DEFAULT_PERCENTILES = [50, 95]
+DEFAULT_LATENCY_TOLERANCE = 0.10    # allowed relative slowdown of a latency percentile
+DEFAULT_THROUGHPUT_TOLERANCE = 0.10 # allowed relative drop in documents per second
+DEFAULT_MIN_KENDALL_TAU = 0.9
+DEFAULT_MAX_SCORE_DRIFT = 0.05
+DEFAULT_BOOTSTRAP_SAMPLES = 2000
+DEFAULT_CONFIDENCE = 0.95
+
+def load_result_sets(directory: str) -> Dict[str, Dict[str, Any]]:
+    """Map model keys to their test results, unnesting combined <type>_<impl>_results.json files
+
+    Files are read oldest first, so a model's newest results win when it
+    appears in more than one file.
+    """
+    result_sets = {}
+    for file_path in sorted(glob.glob(os.path.join(directory, "*_results.json")), key=os.path.getmtime):
+        result_sets.update(load_model_results(file_path))
+    return result_sets
+
+def pin_baseline(results_dir: str = RESULTS_DIR, baseline_dir: str = BASELINE_DIR, model: str = None) -> int:
+    """Write current results into the baseline directory, one file per model"""
+    os.makedirs(baseline_dir, exist_ok=True)
+    pinned = 0
+    for model_name, results in sorted(load_result_sets(results_dir).items()):
+        if model and model_name != model:
+            continue
+        with open(os.path.join(baseline_dir, f"{model_name}_results.json"), 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Pinned baseline: {model_name}")
+        pinned += 1
+    return pinned
+
+def extract_latency_samples(baseline_results: Dict, current_results: Dict) -> Dict[str, np.ndarray]:
+    """Extract paired per-request latencies and document counts for tests successful in both runs"""
+    base_times = []
+    curr_times = []
+    docs = []
+    for test_name in sorted(set(baseline_results) & set(current_results)):
+        base = baseline_results[test_name].get("result", {})
+        curr = current_results[test_name].get("result", {})
+        documents = current_results[test_name].get("test_case", {}).get("documents", [])
+        # Empty test cases short-circuit and carry no timing signal
+        if not documents or not base.get("success") or not curr.get("success"):
+            continue
+        if base.get("time", 0) <= 0 or curr.get("time", 0) <= 0:
+            continue
+        base_times.append(base["time"])
+        curr_times.append(curr["time"])
+        docs.append(len(documents))
+    return {
+        "baseline": np.array(base_times, dtype=float),
+        "current": np.array(curr_times, dtype=float),
+        "docs": np.array(docs, dtype=float)
+    }
+
+def bootstrap_ratio_ci(samples: Dict[str, np.ndarray], statistic, n_samples: int = DEFAULT_BOOTSTRAP_SAMPLES,
+                       confidence: float = DEFAULT_CONFIDENCE, seed: int = 0) -> Dict[str, float]:
+    """Paired bootstrap confidence interval for statistic(current) / statistic(baseline)
+
+    Test cases are resampled jointly so that each resample compares the same
+    queries in both runs, which keeps per-test cost differences out of the interval.
+    """
+    rng = np.random.default_rng(seed)
+    n = len(samples["docs"])
+    all_rows = np.arange(n)
+
+    def ratio(rows):
+        base_value = statistic(samples["baseline"][rows], samples["docs"][rows])
+        curr_value = statistic(samples["current"][rows], samples["docs"][rows])
+        return curr_value / base_value if base_value > 0 else np.inf
+
+    ratios = np.array([ratio(rng.integers(0, n, size=n)) for _ in range(n_samples)])
+    alpha = (1 - confidence) / 2
+    return {
+        "baseline": statistic(samples["baseline"], samples["docs"]),
+        "current": statistic(samples["current"], samples["docs"]),
+        "ratio": float(ratio(all_rows)),
+        "ci_low": float(np.quantile(ratios, alpha)),
+        "ci_high": float(np.quantile(ratios, 1 - alpha))
+    }
+
+def check_latency(baseline_results: Dict, current_results: Dict, percentiles: List[int], latency_tolerance: float,
+                  throughput_tolerance: float, n_samples: int, confidence: float) -> Dict[str, Any]:
+    """Compare latency percentiles and throughput with bootstrap confidence intervals"""
+    samples = extract_latency_samples(baseline_results, current_results)
+
+    if len(samples["docs"]) == 0:
+        return {"checks": [], "regressions": [], "skipped": "no successful timed tests in both runs"}
+
+    checks = []
+
+    for p in percentiles:
+        ci = bootstrap_ratio_ci(samples, lambda times, docs, p=p: float(np.percentile(times, p)), n_samples, confidence)
+        # Only flag when the whole interval sits above the tolerance
+        checks.append({"metric": f"p{p} latency", "unit": "s", **ci, "regressed": ci["ci_low"] > 1 + latency_tolerance})
+
+    def throughput(times, docs):
+        total_time = times.sum()
+        return float(docs.sum() / total_time) if total_time > 0 else 0.0
+
+    ci = bootstrap_ratio_ci(samples, throughput, n_samples, confidence)
+    checks.append({"metric": "throughput", "unit": "docs/s", **ci, "regressed": ci["ci_high"] < 1 - throughput_tolerance})
+
+    return {"checks": checks, "regressions": [c for c in checks if c["regressed"]], "skipped": None}
+
+def kendall_tau(order1: List[int], order2: List[int]) -> float:
+    """Kendall rank correlation between two orderings of the same items"""
+    in_order2 = set(order2)
+    common = [idx for idx in order1 if idx in in_order2]
+    n = len(common)
+    if n < 2:
+        return 1.0
+    in_common = set(common)
+    rank2 = {idx: r for r, idx in enumerate(i for i in order2 if i in in_common)}
+    concordant = 0
+    discordant = 0
+    for i in range(n):
+        for j in range(i + 1, n):
+            if rank2[common[i]] < rank2[common[j]]:
+                concordant += 1
+            else:
+                discordant += 1
+    return (concordant - discordant) / (n * (n - 1) / 2)
+
+def check_rankings(baseline_results: Dict, current_results: Dict, min_kendall_tau: float, max_score_drift: float) -> Dict[str, Any]:
+    """Compare rankings and scores test case by test case"""
+    drifts = []
+    missing = sorted(set(baseline_results) - set(current_results))
+
+    for test_name in sorted(set(baseline_results) & set(current_results)):
+        base = baseline_results[test_name].get("result", {})
+        curr = current_results[test_name].get("result", {})
+
+        if base.get("success") != curr.get("success"):
+            drifts.append({
+                "test_name": test_name,
+                "reason": f"success changed: {base.get('success')} -> {curr.get('success')}",
+                "error": curr.get("error")
+            })
+            continue
+
+        base_rankings = base.get("results", [])
+        curr_rankings = curr.get("results", [])
+        if not base_rankings and not curr_rankings:
+            continue
+
+        base_order = [r["index"] for r in base_rankings]
+        curr_order = [r["index"] for r in curr_rankings]
+        base_scores = {r["index"]: r["relevance_score"] for r in base_rankings}
+        curr_scores = {r["index"]: r["relevance_score"] for r in curr_rankings}
+
+        reasons = []
+        if base_order[:1] != curr_order[:1]:
+            reasons.append(f"top-1 changed: {base_order[:1]} -> {curr_order[:1]}")
+
+        tau = kendall_tau(base_order, curr_order)
+        if tau < min_kendall_tau:
+            reasons.append(f"Kendall tau {tau:.3f} < {min_kendall_tau}")
+
+        score_deltas = {idx: curr_scores[idx] - base_scores[idx] for idx in set(base_scores) & set(curr_scores)}
+        worst_idx = max(score_deltas, key=lambda idx: abs(score_deltas[idx]), default=None)
+        if worst_idx is not None and abs(score_deltas[worst_idx]) > max_score_drift:
+            reasons.append(f"score drift {score_deltas[worst_idx]:+.4f} on doc {worst_idx} (> {max_score_drift})")
+
+        if reasons:
+            drifts.append({
+                "test_name": test_name,
+                "reason": "; ".join(reasons),
+                "baseline_order": base_order,
+                "current_order": curr_order,
+                "score_deltas": score_deltas
+            })
+
+    return {"drifts": drifts, "missing_tests": missing}
+
+def print_model_report(model_name: str, latency: Dict[str, Any], rankings: Dict[str, Any]):
+    """Print a readable diff for one model"""
+    print(f"\n🔍 {model_name}")
+    print("-" * 60)
+
+    if latency["skipped"]:
+        print(f"  ❌ Latency check could not run: {latency['skipped']}")
+    for check in latency["checks"]:
+        status = "❌" if check["regressed"] else "✅"
+        print(f"  {status} {check['metric']:<12} {check['baseline']:.4f} -> {check['current']:.4f} {check['unit']} "
+              f"(x{check['ratio']:.2f}, CI [{check['ci_low']:.2f}, {check['ci_high']:.2f}])")
+
+    for test_name in rankings["missing_tests"]:
+        print(f"  ❌ {test_name}: missing from current run")
+    for drift in rankings["drifts"]:
+        print(f"  ❌ {drift['test_name']}: {drift['reason']}")
+        if "baseline_order" in drift:
+            print(f"      baseline order: {drift['baseline_order']}")
+            print(f"      current order:  {drift['current_order']}")
+    if not rankings["drifts"] and not rankings["missing_tests"]:
+        print("  ✅ Rankings match baseline")
+
+def run_regression_check(results_dir: str = RESULTS_DIR, baseline_dir: str = BASELINE_DIR, model: str = None,
+                         percentiles: List[int] = None, latency_tolerance: float = DEFAULT_LATENCY_TOLERANCE,
+                         throughput_tolerance: float = DEFAULT_THROUGHPUT_TOLERANCE,
+                         min_kendall_tau: float = DEFAULT_MIN_KENDALL_TAU, max_score_drift: float = DEFAULT_MAX_SCORE_DRIFT,
+                         n_samples: int = DEFAULT_BOOTSTRAP_SAMPLES, confidence: float = DEFAULT_CONFIDENCE) -> Dict[str, Any]:
+    """Compare every model in results_dir against its pinned baseline"""
+    percentiles = percentiles or DEFAULT_PERCENTILES
+    baseline_sets = load_result_sets(baseline_dir)
+    current_sets = load_result_sets(results_dir)
+
+    report = {"models": {}, "missing_models": [], "unpinned_models": []}
+
+    for model_name in sorted(set(baseline_sets) | set(current_sets)):
+        if model and model_name != model:
+            continue
+        if model_name not in current_sets:
+            report["missing_models"].append(model_name)
+            continue
+        if model_name not in baseline_sets:
+            report["unpinned_models"].append(model_name)
+            continue
+
+        baseline_results = baseline_sets[model_name]
+        current_results = current_sets[model_name]
+
+        latency = check_latency(baseline_results, current_results, percentiles, latency_tolerance,
+                                throughput_tolerance, n_samples, confidence)
+        rankings = check_rankings(baseline_results, current_results, min_kendall_tau, max_score_drift)
+
+        report["models"][model_name] = {
+            "latency": latency,
+            "rankings": rankings,
+            # A latency check that could not run is a failure, not a pass
+            "regressed": bool(latency["regressions"] or latency["skipped"] or rankings["drifts"] or rankings["missing_tests"])
+        }
+
+    return report
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Reranker Performance Regression Check")
+    parser.add_argument("--pin", action="store_true", help="Pin current results as the new baseline")
+    parser.add_argument("--model", help="Check a single model key, e.g. bge_ollama_bge-base")
+    parser.add_argument("--results-dir", default=RESULTS_DIR, help="Directory with the new run's result files")
+    parser.add_argument("--baseline-dir", default=BASELINE_DIR, help="Directory with pinned baseline result files")
+    parser.add_argument("--percentiles", type=int, nargs="+", default=DEFAULT_PERCENTILES, help="Latency percentiles to compare")
+    parser.add_argument("--latency-tolerance", type=float, default=DEFAULT_LATENCY_TOLERANCE, help="Allowed relative latency increase")
+    parser.add_argument("--throughput-tolerance", type=float, default=DEFAULT_THROUGHPUT_TOLERANCE, help="Allowed relative throughput drop")
+    parser.add_argument("--min-kendall-tau", type=float, default=DEFAULT_MIN_KENDALL_TAU, help="Minimum rank correlation per test")
+    parser.add_argument("--max-score-drift", type=float, default=DEFAULT_MAX_SCORE_DRIFT, help="Maximum absolute score change per document")
+    parser.add_argument("--bootstrap-samples", type=int, default=DEFAULT_BOOTSTRAP_SAMPLES, help="Number of bootstrap resamples")
+    parser.add_argument("--confidence", type=float, default=DEFAULT_CONFIDENCE, help="Confidence level for bootstrap intervals")
+
+    args = parser.parse_args()
+
+    if args.pin:
+        print("📌 PINNING BASELINE RESULTS")
+        print("=" * 60)
+        pinned = pin_baseline(args.results_dir, args.baseline_dir, args.model)
+        print(f"\n💾 Pinned {pinned} model(s) to: {args.baseline_dir}")
+        sys.exit(0 if pinned else 1)
+
+    print("🚦 RERANKER REGRESSION CHECK")
+    print("=" * 60)
+
+    report = run_regression_check(
+        args.results_dir, args.baseline_dir, args.model, args.percentiles,
+        args.latency_tolerance, args.throughput_tolerance, args.min_kendall_tau,
+        args.max_score_drift, args.bootstrap_samples, args.confidence
+    )
+
+    if not report["models"] and not report["missing_models"]:
+        print(f"❌ No baseline found in {args.baseline_dir} (run with --pin first)")
+        sys.exit(1)
+
+    for model_name, model_report in report["models"].items():
+        print_model_report(model_name, model_report["latency"], model_report["rankings"])
+
+    for model_name in report["unpinned_models"]:
+        print(f"\n⚠️  {model_name}: no pinned baseline, skipped")
+    for model_name in report["missing_models"]:
+        print(f"\n❌ {model_name}: pinned in baseline but missing from current run")
+
+    regressed = [name for name, r in report["models"].items() if r["regressed"]] + report["missing_models"]
+
+    print(f"\n📊 REGRESSION SUMMARY")
+    print("=" * 40)
+    print(f"Models checked: {len(report['models'])}")
+    print(f"Models regressed: {len(regressed)}")
+
+    if regressed:
+        for model_name in regressed:
+            print(f"  ❌ {model_name}")
+        sys.exit(1)
+
+    print("\n✅ No regressions against baseline")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+"""
+Columnar Results Store
+======================
+
+Stores reranker results as memory-mapped NumPy columns instead of one nested
+JSON file per model, so analysis can filter by model/test/run without parsing
+every result.
+
+Layout of a store directory:
+    score.bin, index.bin, rank.bin, latency.bin,
+    model_id.bin, test_id.bin, run_id.bin   raw column arrays, one row per scored document
+    segments.bin                            (model, test, run) -> row range, one entry per test result
+    dictionary.json                         id -> name for models, tests and runs, run creation
+                                            times, and the committed row/segment counts
+
+Converting a run appends its rows to the end of every column and its entries
+to the segment table, so existing runs are never read back or rewritten. Each
+(model, test, run) segment is a contiguous slice of the column files. Ids are
+assigned in insertion order, so `runs` lists run ids in creation order and the
+latest run is the last one converted, whatever its name.
+
+Usage:
+    # Append existing results/*_results.json to a store as a new run
+    uv run python results_store.py convert --results-dir results --store-dir results/store --run-id baseline
+
+    # Show what a store contains
+    uv run python results_store.py info --store-dir results/store
+"""
+
+import argparse
+import glob
+import json
+import os
+import time
+from typing import Dict, List, Any
+
+import numpy as np
+
+DEFAULT_STORE_DIR = "results/store"
+
+ROW_COLUMNS = {
+    "score": np.float32,
+    "index": np.int32,
+    "rank": np.int32,
+    "latency": np.float32,
+    "model_id": np.int32,
+    "test_id": np.int32,
+    "run_id": np.int32
+}
+
+SEGMENT_DTYPE = np.dtype([
+    ("model_id", np.int32),
+    ("test_id", np.int32),
+    ("run_id", np.int32),
+    ("start", np.int64),
+    ("end", np.int64),
+    ("latency", np.float64),
+    ("success", np.bool_),
+    ("num_documents", np.int32)
+])
+
+DICTIONARY_FILE = "dictionary.json"
+SEGMENTS_FILE = "segments.bin"
+
+def json_to_segments(results: Dict, model_name: str, run_id: str) -> List[Dict[str, Any]]:
+    """Flatten one model's JSON results into per-test segments"""
+    segments = []
+    for test_name, test_result in results.items():
+        result = test_result.get("result", {})
+        rankings = result.get("results", [])
+        segments.append({
+            "model": model_name,
+            "test": test_name,
+            "run": run_id,
+            "latency": result.get("time", 0),
+            "success": bool(result.get("success", False)),
+            "num_documents": len(test_result.get("test_case", {}).get("documents", [])),
+            "score": np.array([r["relevance_score"] for r in rankings], dtype=np.float32),
+            "index": np.array([r["index"] for r in rankings], dtype=np.int32)
+        })
+    return segments
+
+def read_dictionary(store_dir: str) -> Dict[str, Any]:
+    """Load dictionary.json, or an empty dictionary for a new store"""
+    path = os.path.join(store_dir, DICTIONARY_FILE)
+    if not os.path.exists(path):
+        return {"models": [], "tests": [], "runs": [], "run_created": {}, "rows": 0, "segments": 0}
+    with open(path, 'r') as f:
+        return json.load(f)
+
+def write_dictionary(store_dir: str, dictionary: Dict[str, Any]):
+    """Atomically replace dictionary.json, which commits an append"""
+    path = os.path.join(store_dir, DICTIONARY_FILE)
+    with open(path + ".tmp", 'w') as f:
+        json.dump(dictionary, f, indent=2)
+    os.replace(path + ".tmp", path)
+
+def append_array(path: str, array: np.ndarray, offset: int):
+    """Write array at element offset, dropping anything past it left by an interrupted append"""
+    with open(path, 'r+b' if os.path.exists(path) else 'w+b') as f:
+        f.truncate(offset * array.dtype.itemsize)
+        f.seek(0, os.SEEK_END)
+        array.tofile(f)
+
+def open_array(path: str, dtype, length: int) -> np.ndarray:
+    """Memory-map the first length committed elements of a raw array file"""
+    if length == 0:
+        return np.empty(0, dtype=dtype)
+    return np.memmap(path, dtype=dtype, mode='r', shape=(length,))
+
+def append_store(store_dir: str, segments: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Append segments to a store, creating it if needed
+
+    Only the new rows are written. If a run in `segments` already exists, its
+    old id is retired (mapped to None, so select_segments skips its entries)
+    and the run gets a new id at the end of the run list; the old rows and
+    segments stay on disk unreferenced. Nothing is committed until
+    dictionary.json is replaced, so an interrupted append leaves the store as
+    it was.
+    """
+    os.makedirs(store_dir, exist_ok=True)
+    dictionary = read_dictionary(store_dir)
+    segments_path = os.path.join(store_dir, SEGMENTS_FILE)
+
+    new_runs = {s["run"] for s in segments}
+    dictionary["runs"] = [None if name in new_runs else name for name in dictionary["runs"]]
+
+    def get_id(vocabulary, name):
+        if name not in vocabulary:
+            vocabulary.append(name)
+        return vocabulary.index(name)
+
+    now = time.time()
+    for seg in segments:
+        if seg["run"] not in dictionary["runs"]:
+            dictionary["run_created"][seg["run"]] = now
+        seg["ids"] = (get_id(dictionary["models"], seg["model"]), get_id(dictionary["tests"], seg["test"]),
+                      get_id(dictionary["runs"], seg["run"]))
+
+    total_rows = sum(len(s["score"]) for s in segments)
+    columns = {name: np.empty(total_rows, dtype=dtype) for name, dtype in ROW_COLUMNS.items()}
+    segment_table = np.zeros(len(segments), dtype=SEGMENT_DTYPE)
+
+    row = 0
+    for i, seg in enumerate(segments):
+        n = len(seg["score"])
+        end = row + n
+        model_id, test_id, run_id = seg["ids"]
+        columns["score"][row:end] = seg["score"]
+        columns["index"][row:end] = seg["index"]
+        columns["rank"][row:end] = np.arange(n, dtype=np.int32)
+        columns["latency"][row:end] = seg["latency"]
+        columns["model_id"][row:end] = model_id
+        columns["test_id"][row:end] = test_id
+        columns["run_id"][row:end] = run_id
+        base = dictionary["rows"]
+        segment_table[i] = (model_id, test_id, run_id, base + row, base + end,
+                            seg["latency"], seg["success"], seg["num_documents"])
+        row = end
+
+    for name, column in columns.items():
+        append_array(os.path.join(store_dir, f"{name}.bin"), column, dictionary["rows"])
+    append_array(segments_path, segment_table, dictionary["segments"])
+
+    dictionary["rows"] += total_rows
+    dictionary["segments"] += len(segments)
+    write_dictionary(store_dir, dictionary)
+
+    return {
+        "rows": total_rows,
+        "segments": len(segments),
+        "models": len(dictionary["models"]),
+        "tests": len(dictionary["tests"]),
+        "runs": len([r for r in dictionary["runs"] if r is not None])
+    }
+
+def load_store(store_dir: str = DEFAULT_STORE_DIR) -> Dict[str, Any]:
+    """Open a store with every column memory-mapped
+
+    `runs` is indexed by run id; ids of replaced runs map to None and their
+    segments are ignored by select_segments.
+    """
+    dictionary = read_dictionary(store_dir)
+    return {
+        "columns": {
+            name: open_array(os.path.join(store_dir, f"{name}.bin"), dtype, dictionary["rows"])
+            for name, dtype in ROW_COLUMNS.items()
+        },
+        "segments": open_array(os.path.join(store_dir, SEGMENTS_FILE), SEGMENT_DTYPE, dictionary["segments"]),
+        "models": dictionary["models"],
+        "tests": dictionary["tests"],
+        "runs": dictionary["runs"],
+        "run_created": dictionary["run_created"]
+    }
+
+def list_runs(store: Dict[str, Any]) -> List[str]:
+    """Run ids in creation order"""
+    return [run for run in store["runs"] if run is not None]
+
+def latest_run(store: Dict[str, Any]) -> str:
+    """The most recently converted run, or None for an empty store"""
+    runs = list_runs(store)
+    return runs[-1] if runs else None
+
+def convert_json_results(results_dir: str = "results", store_dir: str = DEFAULT_STORE_DIR, run_id: str = None) -> Dict[str, Any]:
+    """Append results/*_results.json to the store as a new run
+
+    Runs already in the store are left untouched; converting the same run_id
+    again replaces that run and makes it the latest.
+    """
+    run_id = run_id or time.strftime("%Y%m%d-%H%M%S")
+    # Combined <type>_<impl>_results.json files are unnested into their model keys
+    from compare_results import load_model_results
+
+    model_results = {}
+    for file_path in sorted(glob.glob(os.path.join(results_dir, "*_results.json")), key=os.path.getmtime):
+        model_results.update(load_model_results(file_path))
+
+    segments = []
+    for model_name, results in sorted(model_results.items()):
+        segments.extend(json_to_segments(results, model_name, run_id))
+
+    return append_store(store_dir, segments)
+
+def select_segments(store: Dict[str, Any], model=None, test=None, run=None) -> np.ndarray:
+    """Return the segment entries matching model/test/run (names or lists of names)"""
+    segments = store["segments"]
+    # Drop segments of runs that were replaced by a later conversion
+    live_runs = np.array([name is not None for name in store["runs"]] or [False])
+    mask = live_runs[segments["run_id"]] if len(segments) else np.ones(0, dtype=bool)
+    for field, names, vocabulary in (("model_id", model, store["models"]),
+                                     ("test_id", test, store["tests"]),
+                                     ("run_id", run, store["runs"])):
+        if names is None:
+            continue
+        names = [names] if isinstance(names, str) else names
+        ids = [vocabulary.index(name) for name in names if name in vocabulary]
+        mask &= np.isin(segments[field], ids)
+    return segments[mask]
+
+def select_rows(store: Dict[str, Any], model=None, test=None, run=None, columns=("score", "index")) -> Dict[str, np.ndarray]:
+    """Read only the rows of the selected segments for the requested columns"""
+    segments = select_segments(store, model, test, run)
+    selected = {}
+    for name in columns:
+        column = store["columns"][name]
+        parts = [column[int(seg["start"]):int(seg["end"])] for seg in segments]
+        selected[name] = np.concatenate(parts) if parts else np.empty(0, dtype=ROW_COLUMNS[name])
+    return selected
+
+def get_rankings(store: Dict[str, Any], model: str, test: str, run: str = None) -> List[Dict[str, Any]]:
+    """Rankings for one model/test in the JSON results shape
+
+    Without a run filter the most recently converted run containing the
+    model/test is used; run ids are assigned in creation order.
+    """
+    segments = select_segments(store, model, test, run)
+    if len(segments) == 0:
+        return []
+    seg = segments[np.argmax(segments["run_id"])]
+    start, end = int(seg["start"]), int(seg["end"])
+    return [
+        {"index": int(idx), "relevance_score": float(score)}
+        for idx, score in zip(store["columns"]["index"][start:end], store["columns"]["score"][start:end])
+    ]
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Columnar Results Store")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    convert_parser = subparsers.add_parser("convert", help="Convert JSON result files into the store")
+    convert_parser.add_argument("--results-dir", default="results", help="Directory with *_results.json files")
+    convert_parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="Store directory")
+    convert_parser.add_argument("--run-id", help="Run identifier (default: current timestamp)")
+
+    info_parser = subparsers.add_parser("info", help="Show store contents")
+    info_parser.add_argument("--store-dir", default=DEFAULT_STORE_DIR, help="Store directory")
+
+    args = parser.parse_args()
+
+    print("🗄️  COLUMNAR RESULTS STORE")
+    print("=" * 50)
+
+    if args.command == "convert":
+        stats = convert_json_results(args.results_dir, args.store_dir, args.run_id)
+        print(f"✅ Appended {stats['rows']} rows in {stats['segments']} segments "
+              f"(store now has {stats['models']} models, {stats['tests']} tests, {stats['runs']} runs)")
+        print(f"💾 Store saved to: {args.store_dir}")
+    else:
+        store = load_store(args.store_dir)
+        print(f"Rows: {len(store['columns']['score'])}")
+        print(f"Segments: {len(select_segments(store))}")
+        print(f"Runs (oldest first): {', '.join(list_runs(store))}")
+        print(f"Tests: {', '.join(store['tests'])}")
+        print("Models:")
+        for model_name in store["models"]:
+            print(f"  - {model_name}: {len(select_segments(store, model=model_name))} segments")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,409 @@
+#!/usr/bin/env python3
+"""
+First-Stage Vector Retrieval
+============================
+
+Optional retrieval stage in front of the rerankers. A corpus is embedded with a
+bi-encoder (e.g. bge-m3), the vectors are stored in a memory-mapped NumPy index
+and queries are answered with batched top-k search. The top-k candidates are then
+passed to the existing official or Ollama rerankers, so end-to-end latency and
+recall can be benchmarked against k.
+
+Usage:
+    # Build an index from a corpus (JSON list of strings, or JSONL with a "text" field)
+    uv run python retrieval.py build --corpus corpus.jsonl --index-dir index/bge-m3 --embedder ollama --embed-model bge-m3
+
+    # Search the index
+    uv run python retrieval.py search --index-dir index/bge-m3 --query "What is machine learning?" --k 10
+
+    # Benchmark retrieve+rerank for several k values
+    uv run python retrieval.py benchmark --index-dir index/bge-m3 --queries queries.json --k 10 50 100 \\
+        --model-type bge --implementation ollama
+
+Queries file format (JSON list):
+    [{"query": "...", "relevant": [12, 845], "instruction": "...", "top_n": 5}]
+
+`relevant` holds corpus indices and is only needed for recall. Recall after
+rerank is measured at `top_n` (or `--recall-cutoff`, default 10), alongside the
+first-stage recall at the same cut-off.
+"""
+
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+import requests
+
+OLLAMA_EMBED_URL = "http://localhost:11434/api/embed"
+
+EMBEDDINGS_FILE = "embeddings.npy"
+DOCUMENTS_FILE = "documents.jsonl"
+OFFSETS_FILE = "offsets.npy"
+META_FILE = "meta.json"
+
+DEFAULT_RECALL_CUTOFF = 10
+
+DEFAULT_EMBED_MODELS = {
+    'official': "BAAI/bge-m3",
+    'ollama': "bge-m3"
+}
+
+def load_embedder(implementation, model_name=None):
+    """Load a bi-encoder for the official (FlagEmbedding) or Ollama implementation"""
+    model_name = model_name or DEFAULT_EMBED_MODELS[implementation]
+    try:
+        if implementation == 'official':
+            from FlagEmbedding import BGEM3FlagModel
+            print(f"📦 Loading embedding model: {model_name}")
+            return {
+                'implementation': 'official',
+                'model': BGEM3FlagModel(model_name, use_fp16=True),
+                'model_name': model_name
+            }, None
+        return {
+            'implementation': 'ollama',
+            'url': OLLAMA_EMBED_URL,
+            'model_name': model_name
+        }, None
+    except Exception as e:
+        return None, str(e)
+
+def embed_texts(embedder, texts, batch_size=64):
+    """Embed texts into an L2-normalized float32 matrix"""
+    if embedder['implementation'] == 'official':
+        vectors = embedder['model'].encode(texts, batch_size=batch_size)['dense_vecs']
+    else:
+        vectors = []
+        for start in range(0, len(texts), batch_size):
+            response = requests.post(embedder['url'], json={
+                "model": embedder['model_name'],
+                "input": texts[start:start + batch_size]
+            }, timeout=60)
+            response.raise_for_status()
+            vectors.extend(response.json()["embeddings"])
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+def read_corpus(corpus_path):
+    """Yield documents from a JSON list or a JSONL file with one document per line"""
+    with open(corpus_path, 'r') as f:
+        if corpus_path.endswith(".jsonl"):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    yield record["text"] if isinstance(record, dict) else record
+        else:
+            data = json.load(f)
+            for record in data.get("documents", []) if isinstance(data, dict) else data:
+                yield record["text"] if isinstance(record, dict) else record
+
+def count_corpus(corpus_path):
+    """Count documents without holding the corpus in memory"""
+    return sum(1 for _ in read_corpus(corpus_path))
+
+def build_index(corpus_path, index_dir, embedder, batch_size=64):
+    """Embed a corpus and write a memory-mapped index to index_dir"""
+    os.makedirs(index_dir, exist_ok=True)
+    total = count_corpus(corpus_path)
+    if total == 0:
+        raise ValueError(f"Corpus is empty: {corpus_path}")
+
+    embeddings = None
+    offsets = np.lib.format.open_memmap(os.path.join(index_dir, OFFSETS_FILE), mode='w+', dtype=np.int64, shape=(total,))
+    written = 0
+    batch = []
+    start_time = time.time()
+
+    def flush(batch, written):
+        nonlocal embeddings
+        vectors = embed_texts(embedder, batch, batch_size)
+        if embeddings is None:
+            embeddings = np.lib.format.open_memmap(
+                os.path.join(index_dir, EMBEDDINGS_FILE), mode='w+', dtype=np.float32, shape=(total, vectors.shape[1])
+            )
+        embeddings[written:written + len(batch)] = vectors
+        return written + len(batch)
+
+    with open(os.path.join(index_dir, DOCUMENTS_FILE), 'wb') as doc_file:
+        for i, doc in enumerate(read_corpus(corpus_path)):
+            offsets[i] = doc_file.tell()
+            doc_file.write(json.dumps(doc).encode("utf-8") + b"\n")
+            batch.append(doc)
+            if len(batch) == batch_size:
+                written = flush(batch, written)
+                batch = []
+                if written % (batch_size * 100) == 0:
+                    print(f"  Embedded {written}/{total} documents")
+        if batch:
+            written = flush(batch, written)
+
+    embeddings.flush()
+    offsets.flush()
+
+    meta = {
+        "num_documents": total,
+        "dim": int(embeddings.shape[1]),
+        "embedder": embedder['implementation'],
+        "embed_model": embedder['model_name'],
+        "build_time": time.time() - start_time
+    }
+    with open(os.path.join(index_dir, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+def load_index(index_dir):
+    """Open an index with memory-mapped embeddings and document offsets"""
+    with open(os.path.join(index_dir, META_FILE), 'r') as f:
+        meta = json.load(f)
+    return {
+        'embeddings': np.load(os.path.join(index_dir, EMBEDDINGS_FILE), mmap_mode='r'),
+        'offsets': np.load(os.path.join(index_dir, OFFSETS_FILE), mmap_mode='r'),
+        'documents_path': os.path.join(index_dir, DOCUMENTS_FILE),
+        'meta': meta
+    }
+
+def get_documents(index, ids):
+    """Read documents by corpus index without loading the whole corpus"""
+    documents = []
+    with open(index['documents_path'], 'rb') as f:
+        for doc_id in ids:
+            f.seek(int(index['offsets'][doc_id]))
+            documents.append(json.loads(f.readline()))
+    return documents
+
+def search_index(index, query_vectors, k, block_size=65536):
+    """Batched exact top-k inner-product search over the memory-mapped embeddings
+
+    The corpus is scanned in blocks so only one block of vectors is paged in at a
+    time; each block's top-k is merged into the running top-k per query.
+    Returns (scores, ids), both shaped (num_queries, k) and sorted best first.
+    """
+    embeddings = index['embeddings']
+    query_vectors = np.atleast_2d(np.asarray(query_vectors, dtype=np.float32))
+    num_queries = query_vectors.shape[0]
+    k = min(k, embeddings.shape[0])
+
+    best_scores = np.full((num_queries, 0), -np.inf, dtype=np.float32)
+    best_ids = np.empty((num_queries, 0), dtype=np.int64)
+
+    for start in range(0, embeddings.shape[0], block_size):
+        block = np.asarray(embeddings[start:start + block_size])
+        block_scores = query_vectors @ block.T
+
+        block_k = min(k, block_scores.shape[1])
+        top = np.argpartition(-block_scores, block_k - 1, axis=1)[:, :block_k]
+
+        candidate_scores = np.concatenate([best_scores, np.take_along_axis(block_scores, top, axis=1)], axis=1)
+        candidate_ids = np.concatenate([best_ids, top + start], axis=1)
+
+        keep = np.argpartition(-candidate_scores, min(k, candidate_scores.shape[1]) - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(candidate_scores, keep, axis=1)
+        best_ids = np.take_along_axis(candidate_ids, keep, axis=1)
+
+    order = np.argsort(-best_scores, axis=1)
+    return np.take_along_axis(best_scores, order, axis=1), np.take_along_axis(best_ids, order, axis=1)
+
+def retrieve(index, embedder, queries, k):
+    """Embed queries and return the top-k candidates for each"""
+    query_vectors = embed_texts(embedder, queries)
+    scores, ids = search_index(index, query_vectors, k)
+    candidates = []
+    for query_scores, query_ids in zip(scores, ids):
+        documents = get_documents(index, query_ids)
+        candidates.append([
+            {"corpus_index": int(doc_id), "document": doc, "retrieval_score": float(score)}
+            for doc_id, doc, score in zip(query_ids, documents, query_scores)
+        ])
+    return candidates
+
+def recall_at(retrieved_ids, relevant_ids):
+    """Fraction of relevant corpus indices present in retrieved_ids"""
+    if not relevant_ids:
+        return None
+    return len(set(retrieved_ids) & set(relevant_ids)) / len(set(relevant_ids))
+
+def load_reranker(model_type, implementation, model_name=None):
+    """Resolve a reranker from MODEL_CONFIGS and return a rerank(test_case) callable"""
+    from test_reranker import MODEL_CONFIGS, load_bge_model, load_qwen_model, test_official_reranker, test_ollama_reranker
+
+    model_name = model_name or MODEL_CONFIGS[model_type][implementation]['default']
+    if implementation == 'official':
+        loader = load_bge_model if model_type == 'bge' else load_qwen_model
+        model_info, error = loader(model_name)
+        if error:
+            return None, model_name, error
+        return (lambda test_case: test_official_reranker(test_case, model_info)), model_name, None
+    return (lambda test_case: test_ollama_reranker(test_case, model_name)), model_name, None
+
+def benchmark(index, embedder, queries, k_values, rerank, model_name, recall_cutoff=DEFAULT_RECALL_CUTOFF):
+    """Run retrieve+rerank for each query and k, recording latency and recall
+
+    recall@k covers every candidate; recall at the cut-off (the query's top_n,
+    else recall_cutoff) is reported for both the retrieval order and the
+    reranked order, so the reranker's effect is visible.
+    """
+    results = {}
+    for k in k_values:
+        runs = []
+        for i, query_case in enumerate(queries):
+            query = query_case["query"]
+            relevant = query_case.get("relevant", [])
+
+            start_time = time.time()
+            candidates = retrieve(index, embedder, [query], k)[0]
+            retrieval_time = time.time() - start_time
+
+            test_case = {
+                "name": query_case.get("name", f"query_{i}"),
+                "query": query,
+                "documents": [c["document"] for c in candidates]
+            }
+            if "instruction" in query_case:
+                test_case["instruction"] = query_case["instruction"]
+            if "top_n" in query_case:
+                test_case["top_n"] = query_case["top_n"]
+
+            result = rerank(test_case)
+            # Reranker indices refer to the candidate list; map them back to the corpus
+            for res in result["results"]:
+                res["corpus_index"] = candidates[res["index"]]["corpus_index"]
+
+            retrieved_ids = [c["corpus_index"] for c in candidates]
+            reranked_ids = [res["corpus_index"] for res in result["results"]]
+            cutoff = query_case.get("top_n", recall_cutoff)
+
+            runs.append({
+                "name": test_case["name"],
+                "query": query,
+                "success": result["success"],
+                "error": result["error"],
+                "retrieval_time": retrieval_time,
+                "rerank_time": result["time"],
+                "total_time": retrieval_time + result["time"],
+                "recall_cutoff": cutoff,
+                "retrieval_recall": recall_at(retrieved_ids, relevant),
+                "retrieval_recall_at_cutoff": recall_at(retrieved_ids[:cutoff], relevant),
+                "rerank_recall": recall_at(reranked_ids[:cutoff], relevant),
+                "results": result["results"]
+            })
+
+            print(f"  k={k} {test_case['name']}: retrieve {retrieval_time:.3f}s + rerank {result['time']:.3f}s"
+                  f" {'✅' if result['success'] else '❌ ' + str(result['error'])}")
+
+        results[f"k_{k}"] = {"k": k, "model": model_name, "runs": runs, "summary": summarize_runs(runs)}
+    return results
+
+def summarize_runs(runs):
+    """Aggregate latency and recall over a list of benchmark runs"""
+    successful = [r for r in runs if r["success"]]
+    total_times = [r["total_time"] for r in successful]
+
+    def mean(values):
+        values = [v for v in values if v is not None]
+        return sum(values) / len(values) if values else None
+
+    return {
+        "queries": len(runs),
+        "successful": len(successful),
+        "avg_retrieval_time": mean([r["retrieval_time"] for r in successful]) or 0,
+        "avg_rerank_time": mean([r["rerank_time"] for r in successful]) or 0,
+        "avg_total_time": mean(total_times) or 0,
+        "p95_total_time": float(np.percentile(total_times, 95)) if total_times else 0,
+        "retrieval_recall": mean([r["retrieval_recall"] for r in successful]),
+        "retrieval_recall_at_cutoff": mean([r["retrieval_recall_at_cutoff"] for r in successful]),
+        "rerank_recall": mean([r["rerank_recall"] for r in successful])
+    }
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="First-Stage Vector Retrieval")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    def add_embedder_args(p):
+        p.add_argument("--embedder", choices=["official", "ollama"], default="ollama", help="Embedding implementation")
+        p.add_argument("--embed-model", help="Embedding model name (default: bge-m3)")
+
+    build_parser = subparsers.add_parser("build", help="Embed a corpus into a memory-mapped index")
+    build_parser.add_argument("--corpus", required=True, help="Corpus file (.json list or .jsonl)")
+    build_parser.add_argument("--index-dir", required=True, help="Output index directory")
+    build_parser.add_argument("--batch-size", type=int, default=64, help="Embedding batch size")
+    add_embedder_args(build_parser)
+
+    search_parser = subparsers.add_parser("search", help="Search an index")
+    search_parser.add_argument("--index-dir", required=True, help="Index directory")
+    search_parser.add_argument("--query", required=True, help="Query text")
+    search_parser.add_argument("--k", type=int, default=10, help="Number of candidates")
+
+    bench_parser = subparsers.add_parser("benchmark", help="Benchmark retrieve+rerank against k")
+    bench_parser.add_argument("--index-dir", required=True, help="Index directory")
+    bench_parser.add_argument("--queries", required=True, help="Queries JSON file")
+    bench_parser.add_argument("--k", type=int, nargs="+", default=[10, 50, 100], help="Candidate counts to benchmark")
+    bench_parser.add_argument("--model-type", choices=["bge", "qwen"], default="bge", help="Reranker model type")
+    bench_parser.add_argument("--implementation", choices=["official", "ollama"], default="ollama", help="Reranker implementation")
+    bench_parser.add_argument("--model", help="Reranker model name (default from MODEL_CONFIGS)")
+    bench_parser.add_argument("--recall-cutoff", type=int, default=DEFAULT_RECALL_CUTOFF,
+                              help="Cut-off for recall after rerank when a query has no top_n")
+
+    args = parser.parse_args()
+
+    print("🔎 FIRST-STAGE VECTOR RETRIEVAL")
+    print("=" * 50)
+
+    if args.command == "build":
+        embedder, error = load_embedder(args.embedder, args.embed_model)
+        if error:
+            print(f"❌ Failed to load embedder: {error}")
+            return
+        meta = build_index(args.corpus, args.index_dir, embedder, args.batch_size)
+        print(f"✅ Indexed {meta['num_documents']} documents (dim {meta['dim']}) in {meta['build_time']:.1f}s")
+        print(f"💾 Index saved to: {args.index_dir}")
+        return
+
+    index = load_index(args.index_dir)
+    embedder, error = load_embedder(index['meta']['embedder'], index['meta']['embed_model'])
+    if error:
+        print(f"❌ Failed to load embedder: {error}")
+        return
+
+    if args.command == "search":
+        start_time = time.time()
+        candidates = retrieve(index, embedder, [args.query], args.k)[0]
+        print(f"✅ Retrieved {len(candidates)} candidates ({time.time() - start_time:.3f}s)")
+        for i, c in enumerate(candidates):
+            print(f"  {i+1}. [{c['corpus_index']}] {c['document'][:50]}... (score: {c['retrieval_score']:.4f})")
+        return
+
+    with open(args.queries, 'r') as f:
+        queries = json.load(f)
+
+    rerank, model_name, error = load_reranker(args.model_type, args.implementation, args.model)
+    if error:
+        print(f"❌ Failed to load reranker: {error}")
+        return
+
+    print(f"🔧 Reranker: {args.model_type.upper()} {args.implementation.upper()}: {model_name}")
+    results = benchmark(index, embedder, queries, args.k, rerank, model_name, args.recall_cutoff)
+
+    print(f"\n📊 RETRIEVE + RERANK SUMMARY")
+    print("=" * 50)
+    for key, result in results.items():
+        s = result["summary"]
+        def fmt(value):
+            return f"{value:.3f}" if value is not None else "n/a"
+        print(f"  k={result['k']}: total {s['avg_total_time']:.3f}s (p95 {s['p95_total_time']:.3f}s) = "
+              f"retrieve {s['avg_retrieval_time']:.3f}s + rerank {s['avg_rerank_time']:.3f}s | "
+              f"recall@k {fmt(s['retrieval_recall'])} | recall@cutoff "
+              f"retrieval {fmt(s['retrieval_recall_at_cutoff'])} -> rerank {fmt(s['rerank_recall'])}")
+
+    os.makedirs("results", exist_ok=True)
+    filename = f"results/retrieval_{args.model_type}_{args.implementation}_{model_name.replace('/', '_')}.json"
+    with open(filename, 'w') as f:
+        json.dump(results, f, indent=2)
+    print(f"\n💾 Results saved to: {filename}")
+
+if __name__ == "__main__":
+    main()
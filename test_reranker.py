@@ -22,8 +22,30 @@ Usage:
     uv run python test_reranker.py --model BAAI/bge-reranker-v2-m3
     uv run python test_reranker.py --model qwen_reranker_v2
 
+    # Spread Ollama requests over several instances
+    uv run python test_reranker.py --implementation ollama --ollama-endpoints http://node1:11434 http://node2:11434
+    
+    # Fast cold-load of official models with load-time and peak-memory reporting
+    uv run python test_reranker.py --implementation official --fast-load --load-dtype bfloat16
+    
+    # Compile official models per (batch, sequence-length) bucket
+    uv run python test_reranker.py --implementation official --compile
+    
+    # Skip scoring exact and near-duplicate documents
+    uv run python test_reranker.py --dedup --dedup-threshold 0.85
+    
+    # Publish live metrics for scraping while the run is in progress
+    uv run python test_reranker.py --metrics-port 9108
+    
+    # Hedge slow Ollama requests after the model's p95 latency and adapt timeouts
+    uv run python test_reranker.py --implementation ollama --hedge-percentile 95 --adaptive-timeout
+    
+    # Calibrate from 3 warm-up requests per model on top of earlier results/*_results.json latencies
+    uv run python test_reranker.py --implementation ollama --hedge-percentile 95 --latency-warmup 3
+
 Environment Variables:
     MODEL_NAME: Override default model name for Ollama tests
+    OLLAMA_ENDPOINTS: Comma-separated Ollama base URLs to use as an endpoint pool
 """
 
 import json
@@ -31,13 +53,22 @@ import time
 import os
 import glob
 import argparse
+import itertools
+import resource
+import sys
+import threading
 import requests
 import torch
+import transformers
 from transformers import AutoModel, AutoTokenizer, AutoModelForCausalLM, AutoModelForSequenceClassification
 from FlagEmbedding import FlagReranker
 import numpy as np
 from dotenv import load_dotenv
 
+from ollama_client import OllamaPool, load_latency_history
+from metrics import MetricsRegistry, start_metrics_server
+from dedup import rerank_with_dedup, DEFAULT_THRESHOLD
+
 # Load environment variables
 load_dotenv()
 
@@ -119,25 +150,141 @@ def load_test_cases():
     
     return test_cases
 
-def load_bge_model(model_name):
-    """Load BGE reranker model using FlagEmbedding"""
+LOAD_DTYPES = {
+    'float16': torch.float16,
+    'bfloat16': torch.bfloat16,
+    'float32': torch.float32
+}
+
+# Static shape buckets for compiled mode; inputs are padded up to the nearest bucket
+BATCH_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+SEQ_BUCKETS = [64, 128, 256, 512, 1024, 2048, 4096, 8192]
+COMPILE_CACHE_DIR = ".torch_compile_cache"
+COMPILE_TIMING_ITERATIONS = 3  # warm eager and compiled forwards timed per bucket
+
+def get_rss_mb():
+    """Current resident set size in MB, or None where /proc is unavailable"""
     try:
-        print(f"📦 Loading BGE reranker model: {model_name}")
-        reranker = FlagReranker(model_name, use_fp16=True)
-        return {
-            'type': 'bge',
-            'reranker': reranker,
-            'model_name': model_name
-        }, None
+        with open("/proc/self/statm", 'r') as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        return None
+
+def get_peak_rss_mb():
+    """Peak resident set size of the process so far in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is bytes on macOS and kilobytes on Linux
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+def start_load_monitor():
+    """Start timing a model load and sampling its memory high-water mark"""
+    monitor = {
+        'start_time': time.time(),
+        'start_rss': get_rss_mb(),
+        'peak_rss': get_rss_mb(),
+        'stop': threading.Event()
+    }
+    if torch.cuda.is_available():
+        torch.cuda.reset_peak_memory_stats()
+
+    def sample():
+        while not monitor['stop'].wait(0.01):
+            rss = get_rss_mb()
+            if rss is not None:
+                monitor['peak_rss'] = max(monitor['peak_rss'], rss)
+
+    if monitor['start_rss'] is not None:
+        monitor['thread'] = threading.Thread(target=sample, daemon=True)
+        monitor['thread'].start()
+    return monitor
+
+def stop_load_monitor(monitor, fast_load):
+    """Stop a load monitor and return load time and memory stats"""
+    load_time = time.time() - monitor['start_time']
+    monitor['stop'].set()
+    if 'thread' in monitor:
+        monitor['thread'].join()
+        peak_rss = max(monitor['peak_rss'], get_rss_mb())
+        rss_delta = peak_rss - monitor['start_rss']
+    else:
+        # Without per-load sampling the best available figure is the process peak
+        peak_rss = get_peak_rss_mb()
+        rss_delta = None
+    return {
+        'fast_load': fast_load,
+        'load_time': load_time,
+        'peak_rss_mb': peak_rss,
+        'rss_delta_mb': rss_delta,
+        'peak_gpu_mb': torch.cuda.max_memory_allocated() / 2**20 if torch.cuda.is_available() else None
+    }
+
+def get_fast_load_kwargs(load_dtype, device=None):
+    """from_pretrained kwargs that memory-map safetensors weights straight into the target dtype"""
+    # Transformers 5 renamed torch_dtype to dtype and always loads with low CPU memory
+    dtype_key = 'dtype' if int(transformers.__version__.split('.')[0]) >= 5 else 'torch_dtype'
+    kwargs = {
+        'low_cpu_mem_usage': True,
+        dtype_key: LOAD_DTYPES.get(load_dtype, load_dtype)
+    }
+    if device is not None and device != 'cpu':
+        # Stream weights to the GPU instead of materializing them in host RAM first
+        kwargs['device_map'] = device
+    return kwargs
+
+def load_bge_model(model_name, fast_load=False, load_dtype=None):
+    """Load BGE reranker model using FlagEmbedding, or directly with Transformers in fast-load mode"""
+    try:
+        print(f"📦 Loading BGE reranker model: {model_name}{' (fast load)' if fast_load else ''}")
+        monitor = start_load_monitor()
+        try:
+            if fast_load:
+                # FlagReranker does not expose loading options, so load the same cross-encoder directly,
+                # on the device FlagReranker would pick so inference times stay comparable
+                device = 'cuda' if torch.cuda.is_available() else 'cpu'
+                load_dtype = load_dtype or ('float16' if device == 'cuda' else 'float32')
+                tokenizer = AutoTokenizer.from_pretrained(model_name)
+                model = AutoModelForSequenceClassification.from_pretrained(
+                    model_name, **get_fast_load_kwargs(load_dtype, device)
+                ).eval()
+                model_info = {
+                    'type': 'bge',
+                    'tokenizer': tokenizer,
+                    'model': model,
+                    'model_name': model_name
+                }
+            else:
+                reranker = FlagReranker(model_name, use_fp16=True)
+                device = str(get_flag_reranker_device(reranker))
+                model_info = {
+                    'type': 'bge',
+                    'reranker': reranker,
+                    'model_name': model_name
+                }
+        finally:
+            # Stop the sampling thread even when loading fails
+            load_stats = stop_load_monitor(monitor, fast_load)
+        
+        model_info['load_stats'] = {**load_stats, 'device': device}
+        return model_info, None
     except Exception as e:
         return None, str(e)
 
-def load_qwen_model(model_name):
+def load_qwen_model(model_name, fast_load=False, load_dtype=None):
     """Load Qwen3 reranker model using Transformers"""
     try:
-        print(f"📦 Loading Qwen3 reranker model: {model_name}")
-        tokenizer = AutoTokenizer.from_pretrained(model_name, padding_side='left')
-        model = AutoModelForCausalLM.from_pretrained(model_name).eval()
+        print(f"📦 Loading Qwen3 reranker model: {model_name}{' (fast load)' if fast_load else ''}")
+        monitor = start_load_monitor()
+        try:
+            tokenizer = AutoTokenizer.from_pretrained(model_name, padding_side='left')
+            if fast_load:
+                # 'auto' keeps the checkpoint dtype instead of upcasting to fp32; the model stays on
+                # the CPU like the default path so inference times remain comparable
+                model = AutoModelForCausalLM.from_pretrained(model_name, **get_fast_load_kwargs(load_dtype or 'auto')).eval()
+            else:
+                model = AutoModelForCausalLM.from_pretrained(model_name).eval()
+        finally:
+            # Stop the sampling thread even when loading fails
+            load_stats = stop_load_monitor(monitor, fast_load)
         
         # Get token IDs for yes/no
         token_false_id = tokenizer.convert_tokens_to_ids("no")
@@ -159,6 +306,8 @@ def load_qwen_model(model_name):
             'max_length': max_length,
             'prefix_tokens': prefix_tokens,
             'suffix_tokens': suffix_tokens,
+            'input_buffers': {},
+            'load_stats': {**load_stats, 'device': str(model.device)},
             'model_name': model_name
         }, None
     except Exception as e:
@@ -172,18 +321,235 @@ def format_qwen_instruction(instruction, query, doc):
         instruction=instruction, query=query, doc=doc
     )
 
-def process_qwen_inputs(pairs, tokenizer, prefix_tokens, suffix_tokens, max_length, model):
-    """Process inputs for Qwen model"""
+def get_qwen_buffers(buffers, batch_size, seq_len, device):
+    """Return reusable contiguous (input_ids, attention_mask) views of shape batch_size x seq_len
+
+    Buffers are flat tensors that only grow, so repeated calls with similar
+    shapes reuse the same memory instead of allocating new tensors.
+    """
+    needed = batch_size * seq_len
+    if buffers.get('capacity', 0) < needed or buffers.get('device') != device:
+        # Round up so small shape changes do not trigger reallocation
+        capacity = max(needed, 2 * buffers.get('capacity', 0), 1024)
+        buffers['input_ids'] = torch.empty(capacity, dtype=torch.long, device=device)
+        buffers['attention_mask'] = torch.empty(capacity, dtype=torch.long, device=device)
+        if device.type == 'cuda':
+            buffers['staging'] = torch.empty(capacity, dtype=torch.long, pin_memory=True)
+        buffers['capacity'] = capacity
+        buffers['device'] = device
+    return (
+        buffers['input_ids'][:needed].view(batch_size, seq_len),
+        buffers['attention_mask'][:needed].view(batch_size, seq_len)
+    )
+
+def process_qwen_inputs(pairs, tokenizer, prefix_tokens, suffix_tokens, max_length, model, buffers=None, seq_buckets=None):
+    """Process inputs for Qwen model
+
+    Writes prefix, document tokens and suffix straight into preallocated,
+    left-padded input_ids/attention_mask buffers instead of concatenating
+    Python lists and padding a second time. With seq_buckets, the sequence
+    length is padded up to the nearest bucket.
+    """
+    buffers = {} if buffers is None else buffers
     inputs = tokenizer(
         pairs, padding=False, truncation='longest_first',
         return_attention_mask=False, max_length=max_length - len(prefix_tokens) - len(suffix_tokens)
     )
-    for i, ele in enumerate(inputs['input_ids']):
-        inputs['input_ids'][i] = prefix_tokens + ele + suffix_tokens
-    inputs = tokenizer.pad(inputs, padding=True, return_tensors="pt", max_length=max_length)
-    for key in inputs:
-        inputs[key] = inputs[key].to(model.device)
-    return inputs
+    doc_ids = inputs['input_ids']
+    device = model.device
+    num_prefix = len(prefix_tokens)
+    num_suffix = len(suffix_tokens)
+
+    doc_lengths = torch.tensor([len(ele) for ele in doc_ids], dtype=torch.long)
+    seq_lengths = doc_lengths + num_prefix + num_suffix
+    batch_size = len(doc_ids)
+    seq_len = int(seq_lengths.max())
+    if seq_buckets:
+        seq_len = get_bucket(seq_len, seq_buckets)
+
+    # Assemble on the host (pinned staging memory for CUDA), then copy once to the device
+    input_ids, attention_mask = get_qwen_buffers(buffers, batch_size, seq_len, device)
+    if device.type == 'cuda':
+        host_ids = buffers['staging'][:batch_size * seq_len].view(batch_size, seq_len)
+    elif device.type == 'cpu':
+        host_ids = input_ids
+    else:
+        host_ids = torch.empty(batch_size, seq_len, dtype=torch.long)
+
+    if buffers.get('prefix_tokens') is not prefix_tokens or buffers.get('suffix_tokens') is not suffix_tokens:
+        buffers['prefix_tokens'] = prefix_tokens
+        buffers['suffix_tokens'] = suffix_tokens
+        buffers['prefix'] = torch.tensor(prefix_tokens, dtype=torch.long)
+        buffers['suffix'] = torch.tensor(suffix_tokens, dtype=torch.long)
+
+    host_ids.fill_(tokenizer.pad_token_id)
+    # Left padding: every row ends with the suffix, so it lands in the same columns
+    if num_suffix:
+        host_ids[:, seq_len - num_suffix:] = buffers['suffix']
+
+    # Document tokens end right before the suffix; the prefix sits right before them
+    doc_starts = seq_len - num_suffix - doc_lengths
+    rows = torch.arange(batch_size).repeat_interleave(doc_lengths)
+    row_offsets = torch.cumsum(doc_lengths, 0) - doc_lengths
+    cols = torch.arange(int(doc_lengths.sum())) - row_offsets.repeat_interleave(doc_lengths) + doc_starts.repeat_interleave(doc_lengths)
+    flat_ids = np.fromiter(itertools.chain.from_iterable(doc_ids), dtype=np.int64, count=int(doc_lengths.sum()))
+    host_ids[rows, cols] = torch.from_numpy(flat_ids)
+
+    prefix_cols = (doc_starts - num_prefix).unsqueeze(1) + torch.arange(num_prefix)
+    host_ids[torch.arange(batch_size).unsqueeze(1), prefix_cols] = buffers['prefix']
+
+    if host_ids.data_ptr() != input_ids.data_ptr():
+        input_ids.copy_(host_ids, non_blocking=True)
+
+    # Mask is 1 from each row's first real token onwards
+    positions = torch.arange(seq_len, device=device)
+    pad_lengths = (seq_len - seq_lengths).to(device)
+    torch.ge(positions.unsqueeze(0), pad_lengths.unsqueeze(1), out=attention_mask)
+
+    return {'input_ids': input_ids, 'attention_mask': attention_mask}
+
+def get_bucket(value, buckets):
+    """Smallest bucket >= value, or value itself if it exceeds every bucket"""
+    return next((b for b in buckets if b >= value), value)
+
+def pad_to_bucket(inputs, pad_token_id, padding_side):
+    """Pad a batch of tensors up to the nearest (batch, sequence-length) bucket"""
+    batch_size, seq_len = inputs['input_ids'].shape
+    bucket = (get_bucket(batch_size, BATCH_BUCKETS), get_bucket(seq_len, SEQ_BUCKETS))
+    padded = {}
+    for key, tensor in inputs.items():
+        extra = bucket[1] - seq_len
+        if extra:
+            value = pad_token_id if key == 'input_ids' else 0
+            tensor = torch.nn.functional.pad(tensor, (extra, 0) if padding_side == 'left' else (0, extra), value=value)
+        if bucket[0] > batch_size:
+            # Filler rows repeat the first row so no row is fully masked; their scores are dropped
+            tensor = torch.cat([tensor, tensor[:1].expand(bucket[0] - batch_size, -1)])
+        padded[key] = tensor
+    return padded, bucket
+
+def sync_device(device):
+    """Wait for queued GPU work so timings are accurate"""
+    if device.type == 'cuda':
+        torch.cuda.synchronize(device)
+
+def get_flag_reranker_device(reranker):
+    """Device FlagReranker.compute_score runs on"""
+    devices = getattr(reranker, 'target_devices', None)
+    if devices:
+        # FlagEmbedding >= 1.3 only moves the model inside compute_score
+        return torch.device(devices[0])
+    return torch.device(getattr(reranker, 'device', 'cuda' if torch.cuda.is_available() else 'cpu'))
+
+def prepare_flag_reranker_model(reranker):
+    """FlagReranker's model on the device and dtype its compute_score would use"""
+    device = get_flag_reranker_device(reranker)
+    model = reranker.model
+    if getattr(reranker, 'use_fp16', False) and device.type != 'cpu':
+        model = model.half()
+    return model.to(device).eval()
+
+def enable_compiled_mode(model_info, cache_dir=COMPILE_CACHE_DIR):
+    """Compile an official model's scoring forward with static shapes, reusing cached artifacts"""
+    if 'reranker' in model_info:
+        # Score FlagReranker's underlying model directly so input shapes can be bucketed
+        reranker = model_info.pop('reranker')
+        model_info['model'] = prepare_flag_reranker_model(reranker)
+        model_info['tokenizer'] = reranker.tokenizer
+    
+    os.makedirs(cache_dir, exist_ok=True)
+    artifact_path = os.path.join(cache_dir, f"{model_info['model_name'].replace('/', '_')}.bin")
+    cache_loaded = False
+    if os.path.exists(artifact_path) and hasattr(torch.compiler, 'load_cache_artifacts'):
+        with open(artifact_path, 'rb') as f:
+            cache_loaded = torch.compiler.load_cache_artifacts(f.read()) is not None
+    
+    # Every bucket is one static-shape graph; allow that many recompiles
+    limit = len(BATCH_BUCKETS) * len(SEQ_BUCKETS)
+    for name in ('cache_size_limit', 'recompile_limit'):
+        if hasattr(torch._dynamo.config, name):
+            setattr(torch._dynamo.config, name, max(getattr(torch._dynamo.config, name), limit))
+    
+    model_info['compiled'] = {
+        'module': torch.compile(model_info['model'], dynamic=False),
+        'artifact_path': artifact_path,
+        'cache_loaded': cache_loaded,
+        'buckets': {},
+        'warmup_time': 0.0
+    }
+
+def time_forward(forward, inputs, device):
+    """Wall time of one forward pass, including queued GPU work"""
+    start_time = time.time()
+    forward(**inputs)
+    sync_device(device)
+    return time.time() - start_time
+
+def warm_up_bucket(model_info, inputs, bucket):
+    """Compile a new bucket and time warm eager vs. compiled forwards on it
+
+    Returns the seconds spent, which callers keep out of scoring latency.
+    Buckets already warmed cost nothing.
+    """
+    compiled = model_info['compiled']
+    if bucket in compiled['buckets']:
+        return 0.0
+    device = inputs['input_ids'].device
+    start_time = time.time()
+    with torch.no_grad():
+        # One untimed eager pass first so allocator and kernel warm-up do not count against eager
+        model_info['model'](**inputs)
+        sync_device(device)
+        eager_times = [time_forward(model_info['model'], inputs, device) for _ in range(COMPILE_TIMING_ITERATIONS)]
+        first_compiled = time_forward(compiled['module'], inputs, device)
+        compiled_times = [time_forward(compiled['module'], inputs, device) for _ in range(COMPILE_TIMING_ITERATIONS)]
+    compiled['buckets'][bucket] = {
+        'eager_times': eager_times,
+        'compile_time': max(0.0, first_compiled - float(np.median(eager_times))),
+        'compiled_times': compiled_times
+    }
+    warmup_time = time.time() - start_time
+    compiled['warmup_time'] += warmup_time
+    return warmup_time
+
+def run_bucketed_forward(model_info, inputs, bucket):
+    """Run the compiled forward, warming the bucket up first if it is new"""
+    compiled = model_info['compiled']
+    warm_up_bucket(model_info, inputs, bucket)
+    device = inputs['input_ids'].device
+    with torch.no_grad():
+        start_time = time.time()
+        outputs = compiled['module'](**inputs)
+        sync_device(device)
+        compiled['buckets'][bucket]['compiled_times'].append(time.time() - start_time)
+    return outputs
+
+def save_compile_cache(model_info):
+    """Persist compiled artifacts so the next run can skip compilation"""
+    if not hasattr(torch.compiler, 'save_cache_artifacts'):
+        return
+    artifacts = torch.compiler.save_cache_artifacts()
+    if artifacts:
+        with open(model_info['compiled']['artifact_path'], 'wb') as f:
+            f.write(artifacts[0])
+
+def get_compile_stats(model_info):
+    """Summarize compile time and steady-state speedup over the buckets a model used
+
+    Speedup compares median warm eager time with median compiled time per bucket.
+    """
+    buckets = model_info['compiled']['buckets']
+    eager_total = sum(float(np.median(b['eager_times'])) for b in buckets.values())
+    compiled_total = sum(float(np.median(b['compiled_times'])) for b in buckets.values())
+    return {
+        'cache_loaded': model_info['compiled']['cache_loaded'],
+        'buckets': [list(bucket) for bucket in buckets],
+        'compile_time': sum(b['compile_time'] for b in buckets.values()),
+        'warmup_time': model_info['compiled']['warmup_time'],
+        'eager_time': eager_total,
+        'compiled_time': compiled_total,
+        'speedup': eager_total / compiled_total if compiled_total > 0 else None
+    }
 
 def compute_qwen_logits(inputs, model, token_true_id, token_false_id, **kwargs):
     """Compute logits for Qwen model"""
@@ -195,6 +561,28 @@ def compute_qwen_logits(inputs, model, token_true_id, token_false_id, **kwargs):
     scores = batch_scores[:, 1].exp().tolist()
     return scores
 
+def compute_bge_scores(pairs, model, tokenizer, batch_size=256, max_length=512, model_info=None):
+    """Compute normalized cross-encoder scores the way FlagReranker.compute_score does
+
+    When model_info is in compiled mode, each batch is padded to its shape bucket
+    and scored with the compiled forward.
+    """
+    scores = []
+    with torch.no_grad():
+        for start in range(0, len(pairs), batch_size):
+            inputs = tokenizer(
+                pairs[start:start + batch_size], padding=True, truncation=True,
+                max_length=max_length, return_tensors="pt"
+            ).to(model.device)
+            if model_info is not None and 'compiled' in model_info:
+                num_pairs = inputs['input_ids'].shape[0]
+                inputs, bucket = pad_to_bucket(dict(inputs), tokenizer.pad_token_id, tokenizer.padding_side)
+                logits = run_bucketed_forward(model_info, inputs, bucket).logits[:num_pairs].view(-1).float()
+            else:
+                logits = model(**inputs, return_dict=True).logits.view(-1).float()
+            scores.extend(torch.sigmoid(logits).tolist())
+    return scores
+
 def test_official_reranker(test_case, model_info):
     """Test official reranker implementation"""
     try:
@@ -211,34 +599,53 @@ def test_official_reranker(test_case, model_info):
             }
         
         start_time = time.time()
+        warmup_start = model_info['compiled']['warmup_time'] if 'compiled' in model_info else 0.0
         
         if model_info['type'] == 'bge':
             # BGE reranker
             pairs = [[query, doc] for doc in documents]
-            scores = model_info['reranker'].compute_score(pairs, normalize=True)
+            if 'reranker' in model_info:
+                scores = model_info['reranker'].compute_score(pairs, normalize=True)
+            else:
+                scores = compute_bge_scores(pairs, model_info['model'], model_info['tokenizer'], model_info=model_info)
             
         elif model_info['type'] == 'qwen':
             # Qwen reranker
             instruction = test_case.get("instruction", "Given a web search query, retrieve relevant passages that answer the query")
             pairs = [format_qwen_instruction(instruction, query, doc) for doc in documents]
             
-            inputs = process_qwen_inputs(
-                pairs, 
-                model_info['tokenizer'], 
-                model_info['prefix_tokens'], 
-                model_info['suffix_tokens'], 
-                model_info['max_length'], 
-                model_info['model']
-            )
-            
-            scores = compute_qwen_logits(
-                inputs, 
-                model_info['model'], 
-                model_info['token_true_id'], 
-                model_info['token_false_id']
-            )
+            # Compiled mode scores at most the largest batch bucket per forward, so every batch
+            # maps to a bucket and recompiles stay bounded
+            batch_size = BATCH_BUCKETS[-1] if 'compiled' in model_info else len(pairs)
+            scores = []
+            for batch_start in range(0, len(pairs), batch_size):
+                batch = pairs[batch_start:batch_start + batch_size]
+                inputs = process_qwen_inputs(
+                    batch, 
+                    model_info['tokenizer'], 
+                    model_info['prefix_tokens'], 
+                    model_info['suffix_tokens'], 
+                    model_info['max_length'], 
+                    model_info['model'],
+                    model_info.get('input_buffers'),
+                    SEQ_BUCKETS if 'compiled' in model_info else None
+                )
+                
+                forward = model_info['model']
+                if 'compiled' in model_info:
+                    inputs, bucket = pad_to_bucket(inputs, model_info['tokenizer'].pad_token_id, 'left')
+                    forward = lambda **kwargs: run_bucketed_forward(model_info, kwargs, bucket)
+                
+                scores.extend(compute_qwen_logits(
+                    inputs, 
+                    forward, 
+                    model_info['token_true_id'], 
+                    model_info['token_false_id']
+                )[:len(batch)])
         
-        elapsed = time.time() - start_time
+        # New compile buckets are warmed up inside scoring; report that separately from latency
+        warmup_time = model_info['compiled']['warmup_time'] - warmup_start if 'compiled' in model_info else 0.0
+        elapsed = time.time() - start_time - warmup_time
         
         # Create results
         results = []
@@ -257,12 +664,15 @@ def test_official_reranker(test_case, model_info):
         if "top_n" in test_case:
             results = results[:test_case["top_n"]]
         
-        return {
+        result = {
             "success": True,
             "results": results,
             "time": elapsed,
             "error": None
         }
+        if 'compiled' in model_info:
+            result["warmup_time"] = warmup_time
+        return result
         
     except Exception as e:
         return {
@@ -272,8 +682,19 @@ def test_official_reranker(test_case, model_info):
             "error": str(e)
         }
 
-def test_ollama_reranker(test_case, model_name):
-    """Test Ollama reranking API"""
+def test_ollama_reranker(test_case, model_name, pool=None):
+    """Test Ollama reranking API, optionally through a multi-endpoint pool"""
+    if pool is not None:
+        result = pool.rerank(
+            model_name,
+            test_case["query"],
+            test_case["documents"],
+            instruction=test_case.get("instruction"),
+            top_n=test_case.get("top_n")
+        )
+        result.pop("shards", None)
+        return result
+
     url = "http://localhost:11434/api/rerank"
     
     payload = {
@@ -309,7 +730,19 @@ def test_ollama_reranker(test_case, model_name):
             "error": str(e)
         }
 
-def run_tests(model_type=None, implementation=None, specific_model=None):
+def report_test_result(result, model_name, impl, num_documents, metrics=None):
+    """Print dedup savings and record a result in the live metrics, if enabled"""
+    dedup = result.get("dedup")
+    if dedup and dedup["duplicates"]:
+        print(f"🧬 Dedup: scored {dedup['unique']}/{dedup['documents']} documents ({dedup['duplicates']} duplicates)")
+    if metrics is not None:
+        metrics.observe_request(model_name, impl, result, num_documents)
+        if dedup:
+            metrics.observe_cache(model_name, "dedup", dedup["duplicates"], dedup["documents"])
+
+def run_tests(model_type=None, implementation=None, specific_model=None, pool=None, metrics=None,
+              fast_load=False, load_dtype=None, load_stats=None, compile_models=False, dedup_threshold=None,
+              latency_warmup=0):
     """Run tests based on configuration"""
     test_cases = load_test_cases()
     results = {}
@@ -370,15 +803,22 @@ def run_tests(model_type=None, implementation=None, specific_model=None):
         if impl == 'official':
             # Load model
             if model_type == 'bge':
-                model_info, error = load_bge_model(model_name)
+                model_info, error = load_bge_model(model_name, fast_load, load_dtype)
             else:
-                model_info, error = load_qwen_model(model_name)
+                model_info, error = load_qwen_model(model_name, fast_load, load_dtype)
             
             if error:
                 print(f"❌ Failed to load model: {error}")
                 continue
             
-            print(f"✅ Model loaded successfully")
+            stats = model_info['load_stats']
+            print(f"✅ Model loaded successfully ({stats['load_time']:.2f}s, peak RSS {stats['peak_rss_mb']:.0f} MB)")
+            if load_stats is not None:
+                load_stats[model_name] = stats
+            
+            if compile_models:
+                enable_compiled_mode(model_info)
+                print(f"⚙️  Compiled mode enabled{' (cached artifacts loaded)' if model_info['compiled']['cache_loaded'] else ''}")
             
             # Test all cases
             model_results = {}
@@ -387,7 +827,11 @@ def run_tests(model_type=None, implementation=None, specific_model=None):
                 print(f"Query: {test_case['query']}")
                 print(f"Documents: {len(test_case['documents'])}")
                 
-                result = test_official_reranker(test_case, model_info)
+                if dedup_threshold is not None:
+                    result = rerank_with_dedup(test_case, lambda tc: test_official_reranker(tc, model_info), dedup_threshold)
+                else:
+                    result = test_official_reranker(test_case, model_info)
+                report_test_result(result, model_name, impl, len(test_case["documents"]), metrics)
                 model_results[test_case["name"]] = {
                     "test_case": test_case,
                     "result": result
@@ -406,9 +850,28 @@ def run_tests(model_type=None, implementation=None, specific_model=None):
                         score = res["relevance_score"]
                         print(f"  {i+1}. {doc[:50]}... (score: {score:.4f})")
             
+            if compile_models:
+                compile_stats = get_compile_stats(model_info)
+                save_compile_cache(model_info)
+                stats['compile'] = compile_stats
+                speedup = f"{compile_stats['speedup']:.2f}x" if compile_stats['speedup'] else "n/a"
+                print(f"\n⚙️  Compile: {len(compile_stats['buckets'])} buckets, {compile_stats['compile_time']:.2f}s compiling, "
+                      f"{compile_stats['warmup_time']:.2f}s warm-up kept out of test times, steady-state speedup {speedup}")
+            
             results[f"{model_type}_{impl}_{model_name.replace('/', '_')}"] = model_results
             
         else:  # ollama
+            if pool is not None:
+                # Calibrate hedging/adaptive timeouts before the first test instead of after the sweep
+                seeded = pool.seed_latencies(model_name, load_latency_history(model_name))
+                warmed = 0
+                warmup_case = next((tc for tc in test_cases if tc["documents"]), None)
+                if latency_warmup and warmup_case:
+                    warmed = pool.warm_up(model_name, warmup_case["query"], warmup_case["documents"],
+                                          latency_warmup, warmup_case.get("instruction"))
+                if seeded or warmed:
+                    print(f"🕒 Latency window: {seeded} samples from earlier results, {warmed} warm-up requests")
+            
             # Test all cases
             model_results = {}
             for test_case in test_cases:
@@ -416,7 +879,11 @@ def run_tests(model_type=None, implementation=None, specific_model=None):
                 print(f"Query: {test_case['query']}")
                 print(f"Documents: {len(test_case['documents'])}")
                 
-                result = test_ollama_reranker(test_case, model_name)
+                if dedup_threshold is not None:
+                    result = rerank_with_dedup(test_case, lambda tc: test_ollama_reranker(tc, model_name, pool), dedup_threshold)
+                else:
+                    result = test_ollama_reranker(test_case, model_name, pool)
+                report_test_result(result, model_name, impl, len(test_case["documents"]), metrics)
                 
                 # Check if this test is expected to fail
                 expected_to_fail = test_case.get("_test_metadata", {}).get("expected_to_fail", False)
@@ -500,20 +967,70 @@ def print_summary(results):
         print(f"Successful Tests: {successful_tests}")
         print(f"Success Rate: {successful_tests/total_tests*100:.1f}%")
 
+def print_load_stats(load_stats):
+    """Print model load time and memory, reported separately from inference time"""
+    print(f"\n⏱️  MODEL LOAD SUMMARY")
+    print("=" * 50)
+    for model_name, stats in load_stats.items():
+        delta = f", +{stats['rss_delta_mb']:.0f} MB during load" if stats['rss_delta_mb'] is not None else ""
+        gpu = f", peak GPU {stats['peak_gpu_mb']:.0f} MB" if stats['peak_gpu_mb'] is not None else ""
+        mode = "fast" if stats['fast_load'] else "default"
+        device = f", inference on {stats['device']}" if stats.get('device') else ""
+        print(f"  {model_name} ({mode}): {stats['load_time']:.2f}s, peak RSS {stats['peak_rss_mb']:.0f} MB{delta}{gpu}{device}")
+        if 'compile' in stats:
+            compile_stats = stats['compile']
+            speedup = f"{compile_stats['speedup']:.2f}x" if compile_stats['speedup'] else "n/a"
+            print(f"    compiled: {compile_stats['compile_time']:.2f}s compile over {len(compile_stats['buckets'])} buckets, "
+                  f"eager {compile_stats['eager_time']:.3f}s -> compiled {compile_stats['compiled_time']:.3f}s ({speedup})")
+
 def main():
     """Main function"""
     parser = argparse.ArgumentParser(description="Unified Reranker Test Framework")
     parser.add_argument("--model-type", choices=["bge", "qwen"], help="Test specific model type")
     parser.add_argument("--implementation", choices=["official", "ollama"], help="Test specific implementation")
     parser.add_argument("--model", help="Test specific model name")
+    parser.add_argument("--ollama-endpoints", nargs="+", help="Ollama base URLs to balance and shard requests across")
+    parser.add_argument("--hedge-percentile", type=float, help="Send a duplicate Ollama request after this latency percentile")
+    parser.add_argument("--adaptive-timeout", action="store_true", help="Derive Ollama timeouts from each model's measured latency")
+    parser.add_argument("--min-latency-samples", type=int, default=5, help="Latency samples a model needs before hedging/adaptive timeouts apply")
+    parser.add_argument("--latency-warmup", type=int, default=0, help="Untimed Ollama requests per model to calibrate hedging/adaptive timeouts")
+    parser.add_argument("--metrics-port", type=int, help="Serve live Prometheus metrics on this port during the run")
+    parser.add_argument("--fast-load", action="store_true", help="Load official models with memory-mapped weights in the target dtype")
+    parser.add_argument("--dedup", action="store_true", help="Score one representative per near-duplicate document cluster")
+    parser.add_argument("--dedup-threshold", type=float, default=DEFAULT_THRESHOLD, help="MinHash Jaccard threshold for --dedup (1.0 = exact only)")
+    parser.add_argument("--compile", action="store_true", help="torch.compile official models with static shape buckets")
+    parser.add_argument("--load-dtype", choices=["auto", "float16", "bfloat16", "float32"], help="Weight dtype for --fast-load")
     
     args = parser.parse_args()
     
     print("🤖 UNIFIED RERANKER TEST FRAMEWORK")
     print("=" * 50)
     
+    # Set up the Ollama endpoint pool if configured
+    endpoints = args.ollama_endpoints
+    if not endpoints and os.getenv("OLLAMA_ENDPOINTS"):
+        endpoints = [e.strip() for e in os.getenv("OLLAMA_ENDPOINTS").split(",") if e.strip()]
+    
+    pool = None
+    if endpoints or args.hedge_percentile is not None or args.adaptive_timeout:
+        pool = OllamaPool(endpoints, hedge_percentile=args.hedge_percentile, adaptive_timeout=args.adaptive_timeout,
+                          min_latency_samples=args.min_latency_samples)
+        health = pool.check_all()
+        print(f"🌐 Ollama endpoint pool: {sum(health.values())}/{len(health)} healthy")
+        for endpoint, healthy in health.items():
+            print(f"  {'✅' if healthy else '❌'} {endpoint}")
+    
+    metrics = None
+    if args.metrics_port:
+        metrics = MetricsRegistry()
+        start_metrics_server(metrics, args.metrics_port)
+        print(f"📡 Metrics available at http://127.0.0.1:{args.metrics_port}/metrics")
+    
     # Run tests
-    results = run_tests(args.model_type, args.implementation, args.model)
+    load_stats = {}
+    results = run_tests(args.model_type, args.implementation, args.model, pool, metrics,
+                        args.fast_load, args.load_dtype, load_stats, args.compile,
+                        args.dedup_threshold if args.dedup else None, args.latency_warmup)
     
     if results:
         # Save results
@@ -522,6 +1039,28 @@ def main():
         # Print summary
         print_summary(results)
         
+        if load_stats:
+            print_load_stats(load_stats)
+            with open("results/load_stats.json", 'w') as f:
+                json.dump(load_stats, f, indent=2)
+            print(f"💾 Load and compile stats saved to: results/load_stats.json")
+        
+        if pool is not None:
+            print(f"\n🌐 ENDPOINT USAGE")
+            print("=" * 40)
+            for endpoint, state in pool.stats().items():
+                print(f"  {endpoint}: {state['requests']} requests, {state['errors']} errors, "
+                      f"{'healthy' if state['healthy'] else 'unhealthy'}")
+            
+            if args.hedge_percentile is not None or args.adaptive_timeout:
+                print(f"\n🛡️  HEDGING & TIMEOUTS")
+                print("=" * 40)
+                for model, stats in pool.hedging_stats().items():
+                    delay = f"{stats['hedge_delay']:.3f}s" if stats['hedge_delay'] is not None else "uncalibrated"
+                    print(f"  {model}: {stats['hedged']}/{stats['requests']} hedged ({stats['hedge_rate']*100:.1f}%), "
+                          f"{stats['hedge_wins']} hedge wins (abandoned primaries had run {stats['abandoned_time']:.3f}s), "
+                          f"hedge delay {delay}, timeout {stats['timeout']:.2f}s")
+        
         print("\n✅ Tests completed successfully")
     else:
         print("❌ No tests were run")